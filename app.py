@@ -2,8 +2,9 @@
 import os
 import io
 import json
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Tuple
 
 from fastapi import (
     FastAPI,
@@ -19,26 +20,45 @@ from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from openai import OpenAI
-import tempfile
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
+import llm
+import db_async
+from export import export_chunks, filename as export_filename, FORMATS as EXPORT_FORMATS
 from brain import (
     ask_orlem,
     summarize_transcript,
+    update_summary,
     diarize_transcript,
     extract_decisions,
     extract_actions,
     client_status_message,  # mantido p/ compat
+    mentions_orlem,
+    FORMAT_GUARD_STATS,
 )
-from db import (
+from cache import response_cache, CACHE_PURGE_S
+from singleflight import SingleFlight
+from sessions import session_store, SESSION_IDLE_S, SESSION_PURGE_S
+from routing import model_router
+from resilience import UpstreamUnavailable
+from retrieval import meeting_memory
+from writebehind import message_writer
+from identity import identity
+from transcript import build_transcript, TRANSCRIPT_MAX_TOKENS, DIARIZE_MAX_TOKENS
+# banco pelas threads do db_async: query nenhuma trava o event loop
+from db_async import (
+    run_db,
     init_db,
-    get_or_create_default_user,
     create_meeting,
     list_meetings,
-    add_message,
     get_meeting_messages,
+    get_meeting_message_stats,
+    get_summary_state,
+    save_summary_state,
+    finalize_meeting,
+    search_messages,
+    search_meetings,
 )
 
 load_dotenv()
@@ -61,8 +81,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# cliente OpenAI único
-client = OpenAI()
+
+# tarefas de limpeza periódica (canceladas no shutdown)
+_housekeeping: List[asyncio.Task] = []
+
+
+async def _every(interval_s: float, name: str, fn, *args) -> None:
+    """Roda fn(*args) numa thread do banco na subida e depois a cada interval_s."""
+    while True:
+        try:
+            removed = await run_db(fn, *args)
+            if removed:
+                print(f"[{name}] {removed} removidos")
+        except Exception as e:
+            print(f"ERRO {name}:", e)
+        await asyncio.sleep(interval_s)
+
+
+@app.on_event("startup")
+async def _startup_db():
+    # garante tabelas novas (ex.: llm_cache) em bancos já existentes
+    await init_db()
+    # usuário/workspace resolvidos agora; os pedidos só leem o cache
+    await identity.get()
+    # põe o índice da memória em dia com o que foi gravado com ele parado
+    asyncio.create_task(meeting_memory.sync())
+    # sessões paradas saem do session_states
+    _housekeeping.append(asyncio.create_task(
+        _every(SESSION_PURGE_S, "sessions", session_store.purge_idle, SESSION_IDLE_S)
+    ))
+    # respostas com TTL vencido saem do llm_cache (a leitura só as ignora)
+    _housekeeping.append(asyncio.create_task(
+        _every(CACHE_PURGE_S, "cache", response_cache.purge_expired)
+    ))
+
+
+@app.on_event("shutdown")
+async def _close_llm_pool():
+    for task in _housekeeping:
+        task.cancel()
+    # falas na fila vão pro banco antes de fechar (e daí pro índice da memória)
+    await message_writer.close()
+    await meeting_memory.flush()
+    await llm.aclose()
+    db_async.shutdown()
+
 
 MEETINGS_DIR = "meetings"
 os.makedirs(MEETINGS_DIR, exist_ok=True)
@@ -116,6 +179,23 @@ LOG_DIR = "logs"
 os.makedirs(LOG_DIR, exist_ok=True)
 
 
+def record_message(
+    meeting_id: int, role: str, content: str, workspace_id: Optional[int] = None
+) -> "asyncio.Future[int]":
+    """
+    Grava a fala pelo escritor em lote (não espera o commit) e, com o id em
+    mãos, indexa na memória da reunião. Quem vai ler a reunião do banco logo
+    em seguida chama message_writer.flush() antes. workspace_id: o da reunião,
+    se quem chama já sabe (senão a memória busca no banco, fora do event loop).
+    """
+    return message_writer.add(
+        meeting_id,
+        role,
+        content,
+        on_saved=lambda msg_id: meeting_memory.index_message(msg_id, meeting_id, role, content, workspace_id),
+    )
+
+
 def _log_filename(session_id: str) -> str:
     return os.path.join(LOG_DIR, f"{session_id}.jsonl")
 
@@ -255,17 +335,159 @@ async def rename_log(payload: Dict[str, Any]):
 # =========================================
 # API (reuniões / banco)
 # =========================================
+@app.get("/api/stats")
+async def api_stats():
+    """Contadores internos (cache de respostas, guarda de formato etc.)."""
+    return {
+        "cache": response_cache.stats(),
+        "format_guard": dict(FORMAT_GUARD_STATS),
+        "singleflight": analysis_flight.stats(),
+        "backend": llm.get_backend().describe(),
+        "routing": model_router.stats(),
+        "resilience": llm.resilience_stats(),
+        "retrieval": meeting_memory.stats(),
+        "writer": message_writer.stats(),
+        "db": db_async.stats(),
+        "identity": identity.stats(),
+    }
+
+
 @app.get("/api/meetings")
-async def api_list_meetings():
-    user_id = get_or_create_default_user()
-    meetings = list_meetings(user_id)
-    return {"meetings": meetings}
+async def api_list_meetings(
+    limit: int = Query(50, ge=1, le=200),
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+):
+    """
+    Reuniões da mais nova pra mais antiga, em páginas de `limit`.
+    Próxima página (mais antigas): before_id=next_before_id. Só as criadas
+    depois de uma que o cliente já tem: after_id=<id dela>; a página vem colada
+    no cursor e, com has_more, a seguinte (mais novas) é after_id=next_after_id.
+    next_after_id (a maior id vista) também serve pra buscar só as novas depois.
+    """
+    ident = await identity.get()
+    meetings = await list_meetings(ident.user_id, limit=limit + 1, before_id=before_id, after_id=after_id)
+    has_more = len(meetings) > limit
+    # a sobra fica do lado de lá do cursor: depois de after_id é a mais nova
+    meetings = meetings[1:] if has_more and after_id is not None else meetings[:limit]
+    return {
+        "meetings": meetings,
+        "has_more": has_more,
+        "next_before_id": meetings[-1]["id"] if meetings and has_more and after_id is None else None,
+        # sem before_id a página tem a mais nova vista até aqui
+        "next_after_id": (meetings[0]["id"] if meetings else after_id) if before_id is None else None,
+    }
 
 
 @app.get("/api/meetings/{meeting_id}")
-async def api_get_meeting(meeting_id: int):
-    msgs = get_meeting_messages(meeting_id)
-    return {"messages": msgs}
+async def api_get_meeting(
+    meeting_id: int,
+    limit: int = Query(200, ge=1, le=1000),
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    since_id: Optional[int] = None,
+):
+    """
+    Mensagens da reunião em ordem cronológica, em páginas de `limit`:
+    - sem cursor: as últimas; before_id=first_id traz as anteriores
+    - after_id / since_id (polling): só as novas, a partir da mais antiga;
+      com has_more, chama de novo com since_id=last_id
+    """
+    await message_writer.flush()  # inclui as falas ainda na fila
+    since_id = since_id if since_id is not None else after_id
+    msgs = await get_meeting_messages(meeting_id, since_id=since_id, limit=limit + 1, before_id=before_id)
+    has_more = len(msgs) > limit
+    # a sobra fica do lado de lá do cursor: no polling é a mais nova
+    msgs = msgs[:limit] if since_id is not None else msgs[-limit:]
+    return {
+        "messages": msgs,
+        "has_more": has_more,
+        "first_id": msgs[0]["id"] if msgs else None,
+        "last_id": msgs[-1]["id"] if msgs else since_id,
+    }
+
+
+def _parse_search_date(value: Optional[str], name: str, end: bool = False) -> Optional[datetime]:
+    """ISO (data ou data+hora). Só data no `until` vale o dia inteiro."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} inválido (use ISO, ex.: 2024-05-31)")
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+@app.get("/api/export")
+async def api_export(
+    type: str = Query("messages", pattern="^(meetings|messages)$"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    workspace_id: Optional[int] = None,
+    meeting_id: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Exporta reuniões ou mensagens (um workspace, uma reunião, um intervalo) em
+    NDJSON ou CSV, em streaming: o banco é lido em lotes e a resposta sai
+    enquanto lê (ver export.py). gzip=true devolve o arquivo .gz.
+    """
+    since_dt = _parse_search_date(since, "since")
+    until_dt = _parse_search_date(until, "until", end=True)
+    await message_writer.flush()  # inclui as falas ainda na fila
+    chunks = export_chunks(
+        type=type,
+        format=format,
+        gzip=gzip,
+        workspace_id=workspace_id,
+        meeting_id=meeting_id,
+        since=since_dt,
+        until=until_dt,
+    )
+    return StreamingResponse(
+        db_async.iterate(chunks),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(type, format, gzip)}"'},
+    )
+
+
+@app.get("/api/search")
+async def api_search(
+    q: str = Query(..., min_length=1),
+    type: str = Query("messages", pattern="^(messages|meetings)$"),
+    meeting_id: Optional[int] = None,
+    role: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    """
+    Busca textual nas falas (type=messages) ou nos títulos (type=meetings).
+    Ordem por relevância (bm25), trecho com <mark>, filtros por reunião/papel/data
+    e paginação: mande o next_cursor da resposta para a próxima página.
+    """
+    since_dt = _parse_search_date(since, "since")
+    until_dt = _parse_search_date(until, "until", end=True)
+    try:
+        if type == "meetings":
+            page = await search_meetings(q, since=since_dt, until=until_dt, limit=limit, cursor=cursor)
+        else:
+            page = await search_messages(
+                q,
+                meeting_id=meeting_id,
+                role=role,
+                since=since_dt,
+                until=until_dt,
+                limit=limit,
+                cursor=cursor,
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"query": q, "type": type, **page}
 
 
 @app.get("/api/meeting/open")
@@ -274,56 +496,201 @@ async def api_meeting_open(session_id: str = Query(...)):
     Retorna meeting_id existente para session_id (se já houver mensagens),
     senão None — criação passa a ser on-demand (primeira mensagem).
     """
-    user_id = get_or_create_default_user()
     logname = f"{session_id}.jsonl"
     has_log = os.path.exists(os.path.join(LOG_DIR, logname))
     return {"meeting_id": None, "has_log": has_log}
 
 
-def _build_transcript_from_meeting(meeting_id: int) -> str:
-    msgs = get_meeting_messages(meeting_id)
-    if not msgs:
-        return ""
-    return "\n".join(f"{m['role']}: {m['content']}" for m in msgs)
+async def _build_transcript_from_meeting(
+    meeting_id: int,
+    max_tokens: Optional[int] = None,
+    query: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Transcrição da reunião pronta pro LLM (sem [RESUMO]/[DIARIZAÇÃO] do Orlem),
+    opcionalmente cortada num orçamento de tokens. Ver transcript.build_transcript.
+    """
+    msgs = await get_meeting_messages(meeting_id)
+    # contagens vão na resposta (campo "transcript"), não no log
+    return build_transcript(msgs, max_tokens=max_tokens, query=query)
+
+
+def _transcript_info(built: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "tokens": built["tokens"],
+        "messages": built["messages"],
+        "dropped": built["dropped"],
+        "dropped_tokens": built["dropped_tokens"],
+    }
+
+
+async def compute_meeting_summary(
+    meeting_id: int, full: bool = False
+) -> Tuple[str, Optional[int]]:
+    """
+    Resumo da reunião a partir do estado salvo no banco (meeting_summaries).
+
+    - Normal: pega o resumo acumulado e incorpora só as mensagens novas desde o
+      checkpoint (custo proporcional ao que mudou, não ao tamanho da reunião).
+    - full=True: recalcula do zero com a transcrição inteira.
+    Os próprios [RESUMO]/[DIARIZAÇÃO] do Orlem não entram no resumo.
+
+    Retorna (resumo, novo checkpoint). Checkpoint None = nada a gravar.
+    """
+    state = None if full else await get_summary_state(meeting_id)
+    since_id = state["last_message_id"] if state else None
+
+    msgs = await get_meeting_messages(meeting_id, since_id=since_id)
+    checkpoint = max((m["id"] for m in msgs), default=since_id or 0)
+    transcript = build_transcript(msgs)["text"]
+
+    if state is None:
+        summary = await summarize_transcript(transcript)
+        if not msgs:
+            return summary, None  # placeholder; nada pra guardar ainda
+    elif not transcript.strip():
+        summary = state["summary"]
+        if checkpoint == since_id:
+            return summary, None
+    else:
+        summary = await update_summary(state["summary"], transcript)
+
+    return summary, checkpoint
+
+
+async def meeting_summary(meeting_id: int, full: bool = False) -> str:
+    """compute_meeting_summary + grava o novo estado."""
+    summary, checkpoint = await compute_meeting_summary(meeting_id, full=full)
+    if checkpoint is not None:
+        await save_summary_state(meeting_id, summary, checkpoint)
+    return summary
+
+
+# pedidos iguais e simultâneos (várias abas na mesma reunião) dividem uma chamada.
+# A chave inclui a última mensagem: transcrição nova = execução nova.
+analysis_flight = SingleFlight("analysis")
 
 
 @app.get("/api/meetings/{meeting_id}/summary")
-async def api_meeting_summary(meeting_id: int):
-    transcript = _build_transcript_from_meeting(meeting_id)
-    if not transcript.strip():
+async def api_meeting_summary(meeting_id: int, full: bool = Query(False)):
+    await message_writer.flush()
+    # só contagem e último id: o resumo incremental lê as falas novas sozinho
+    stats = await get_meeting_message_stats(meeting_id)
+    if not stats["count"]:
         raise HTTPException(status_code=400, detail="Reunião sem mensagens.")
 
-    summary = await summarize_transcript(transcript)
-    return {"meeting_id": meeting_id, "summary": summary}
+    summary = await analysis_flight.do(
+        ("summary", meeting_id, stats["last_message_id"], full),
+        lambda: meeting_summary(meeting_id, full=full),
+    )
+    return {
+        "meeting_id": meeting_id,
+        "summary": summary,
+        "transcript": {"messages": stats["count"], "last_message_id": stats["last_message_id"]},
+    }
 
 
 @app.get("/api/meetings/{meeting_id}/decisions")
 async def api_meeting_decisions(meeting_id: int):
-    transcript = _build_transcript_from_meeting(meeting_id)
-    if not transcript.strip():
+    await message_writer.flush()
+    built = await _build_transcript_from_meeting(meeting_id, max_tokens=TRANSCRIPT_MAX_TOKENS)
+    if not built["text"].strip():
         raise HTTPException(status_code=400, detail="Reunião sem mensagens.")
 
-    decisions = await extract_decisions(transcript)
-    return {"meeting_id": meeting_id, "decisions": decisions}
+    decisions = await analysis_flight.do(
+        ("decisions", meeting_id, built["last_message_id"]),
+        lambda: extract_decisions(built["text"]),
+    )
+    return {"meeting_id": meeting_id, "decisions": decisions, "transcript": _transcript_info(built)}
 
 
 @app.get("/api/meetings/{meeting_id}/actions")
 async def api_meeting_actions(meeting_id: int):
-    transcript = _build_transcript_from_meeting(meeting_id)
-    if not transcript.strip():
+    await message_writer.flush()
+    built = await _build_transcript_from_meeting(meeting_id, max_tokens=TRANSCRIPT_MAX_TOKENS)
+    if not built["text"].strip():
         raise HTTPException(status_code=400, detail="Reunião sem mensagens.")
 
-    actions = await extract_actions(transcript)
-    return {"meeting_id": meeting_id, "actions": actions}
+    actions = await analysis_flight.do(
+        ("actions", meeting_id, built["last_message_id"]),
+        lambda: extract_actions(built["text"]),
+    )
+    return {"meeting_id": meeting_id, "actions": actions, "transcript": _transcript_info(built)}
 
 
 # =========================================
-# WEBSOCKET
-# session_id -> meeting_id
+# ENCERRAMENTO: artefatos em paralelo
 # =========================================
-active_sessions: Dict[str, int] = {}
 
+# artefato -> tipo do frame enviado ao front
+END_FRAMES = {
+    "summary": "summary",
+    "decisions": "decisions",
+    "actions": "actions",
+    "diarization": "diarize",
+}
+
+
+async def run_end_pipeline(
+    ws: WebSocket, meeting_id: int, transcript: str
+) -> Tuple[Dict[str, str], Optional[int]]:
+    """
+    Gera resumo, decisões, ações e diarização ao mesmo tempo e manda cada um
+    pro front assim que fica pronto. Nada é gravado aqui: quem chama persiste
+    tudo numa transação só (finalize_meeting).
+
+    Retorna (artefatos gerados, checkpoint do resumo). Se uma etapa falhar, ela
+    fica de fora do dict e o front recebe um aviso; as outras seguem normalmente.
+    """
+    tasks = {
+        asyncio.create_task(compute_meeting_summary(meeting_id)): "summary",
+        asyncio.create_task(extract_decisions(transcript)): "decisions",
+        asyncio.create_task(extract_actions(transcript)): "actions",
+        asyncio.create_task(diarize_transcript(transcript)): "diarization",
+    }
+    artifacts: Dict[str, str] = {}
+    checkpoint: Optional[int] = None
 
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                kind = tasks[task]
+                try:
+                    result = task.result()
+                except Exception as e:
+                    print(f"Erro no encerramento ({kind}):", e)
+                    await ws.send_text(
+                        json.dumps(
+                            {
+                                "type": "warn",
+                                "answer": f"⚠️ Não consegui gerar: {kind}.",
+                            }
+                        )
+                    )
+                    continue
+
+                if kind == "summary":
+                    result, checkpoint = result
+                artifacts[kind] = result
+                await ws.send_text(
+                    json.dumps({"type": END_FRAMES[kind], "answer": result})
+                )
+    finally:
+        # cliente caiu no meio: não deixa chamadas órfãs rodando
+        for task in tasks:
+            task.cancel()
+
+    return artifacts, checkpoint
+
+
+# =========================================
+# WEBSOCKET
+# session_id -> reunião/tom ficam no session_store (vale entre workers)
+# =========================================
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
     await ws.accept()
@@ -333,7 +700,7 @@ async def websocket_endpoint(ws: WebSocket):
     session_id: Optional[str] = params.get("session_id") or "session-local"
 
     meeting_id: Optional[int] = None
-    user_id = get_or_create_default_user()
+    ident = await identity.get()
 
     # manda status inicial pro front (Lovable)
     try:
@@ -366,17 +733,22 @@ async def websocket_endpoint(ws: WebSocket):
 
             # se o front enviar outro session_id, atualiza
             sess_from_front = payload.get("session_id")
-            if sess_from_front:
+            if sess_from_front and sess_from_front != session_id:
                 session_id = sess_from_front
+                if meeting_id is not None:
+                    await run_db(session_store.bind_meeting, session_id, meeting_id)
+            if session_store.due_for_touch(session_id):
+                await run_db(session_store.touch, session_id)
 
             # criação on-demand da reunião (primeira mensagem ou primeiro comando)
             if meeting_id is None and (text or action in {"summarize", "diarize", "end"}):
-                meeting_id = create_meeting(
-                    user_id,
+                meeting_id = await create_meeting(
+                    ident.user_id,
                     title="Reunião via WebSocket",
                     source="local",
+                    workspace_id=ident.workspace_id,
                 )
-                active_sessions[session_id] = meeting_id
+                await run_db(session_store.bind_meeting, session_id, meeting_id)
                 await ws.send_text(
                     json.dumps(
                         {
@@ -401,14 +773,14 @@ async def websocket_endpoint(ws: WebSocket):
                     )
                     continue
 
-                msgs = get_meeting_messages(meeting_id)
-                transcript = "\n".join(
-                    f"{m['role']}: {m['content']}" for m in msgs
+                # incremental: só as falas novas desde o último resumo
+                # ("full": true recalcula tudo)
+                await message_writer.flush()
+                answer = await meeting_summary(
+                    meeting_id, full=bool(payload.get("full"))
                 )
-
-                answer = await summarize_transcript(transcript)
                 append_to_log(session_id, "orlem", "[RESUMO] " + answer)
-                add_message(meeting_id, "orlem", "[RESUMO] " + answer)
+                record_message(meeting_id, "orlem", "[RESUMO] " + answer, ident.workspace_id)
 
                 await ws.send_text(
                     json.dumps({"type": "summary", "answer": answer})
@@ -430,14 +802,13 @@ async def websocket_endpoint(ws: WebSocket):
                     )
                     continue
 
-                msgs = get_meeting_messages(meeting_id)
-                transcript = "\n".join(
-                    f"{m['role']}: {m['content']}" for m in msgs
+                await message_writer.flush()
+                built = await _build_transcript_from_meeting(
+                    meeting_id, max_tokens=DIARIZE_MAX_TOKENS
                 )
-
-                answer = await diarize_transcript(transcript)
+                answer = await diarize_transcript(built["text"])
                 append_to_log(session_id, "orlem", "[DIARIZAÇÃO] " + answer)
-                add_message(meeting_id, "orlem", "[DIARIZAÇÃO] " + answer)
+                record_message(meeting_id, "orlem", "[DIARIZAÇÃO] " + answer, ident.workspace_id)
 
                 await ws.send_text(
                     json.dumps({"type": "diarize", "answer": answer})
@@ -469,11 +840,10 @@ async def websocket_endpoint(ws: WebSocket):
                     )
                 )
 
-                # pega todo o histórico da reunião
-                msgs = get_meeting_messages(meeting_id)
-                transcript = "\n".join(
-                    f"{m['role']}: {m['content']}" for m in msgs
-                )
+                # pega todo o histórico da reunião (sem os artefatos do Orlem)
+                await message_writer.flush()
+                msgs = await get_meeting_messages(meeting_id)
+                transcript = build_transcript(msgs)["text"]
 
                 if not transcript.strip():
                     await ws.send_text(
@@ -486,32 +856,34 @@ async def websocket_endpoint(ws: WebSocket):
                     )
                     continue
 
-                # resumo final
-                summary = await summarize_transcript(transcript)
-                append_to_log(session_id, "orlem", "[RESUMO] " + summary)
-                add_message(meeting_id, "orlem", "[RESUMO] " + summary)
-
-                # tenta extrair decisões / ações / diarização do histórico
-                decisions = "\n".join(
-                    m["content"]
-                    for m in msgs
-                    if "[DECISÃO]" in m.get("content", "")
+                artifacts, checkpoint = await run_end_pipeline(
+                    ws, meeting_id, transcript
                 )
+                summary = artifacts.get("summary", "")
 
-                actions = "\n".join(
-                    m["content"]
-                    for m in msgs
-                    if any(
-                        tag in m.get("content", "")
-                        for tag in ["[TAREFA]", "[ACTION]", "[PRÓXIMO PASSO]"]
+                # grava tudo de uma vez: artefatos, [RESUMO], checkpoint e status
+                # (etapa que falhou não sobrescreve o que já estava salvo)
+                try:
+                    await finalize_meeting(
+                        meeting_id,
+                        artifacts=artifacts,
+                        messages=[("orlem", "[RESUMO] " + summary)] if summary else [],
+                        summary_checkpoint=checkpoint,
                     )
-                )
+                except Exception as e:
+                    print("Erro ao finalizar reunião:", e)
+                    await ws.send_text(
+                        json.dumps(
+                            {
+                                "type": "error",
+                                "answer": "❌ Erro ao salvar o encerramento da reunião.",
+                            }
+                        )
+                    )
+                    continue
 
-                diarization = "\n".join(
-                    m["content"]
-                    for m in msgs
-                    if "[DIARIZAÇÃO]" in m.get("content", "")
-                )
+                if summary:
+                    append_to_log(session_id, "orlem", "[RESUMO] " + summary)
 
                 # salva a reunião em JSON na pasta meetings/
                 try:
@@ -520,16 +892,17 @@ async def websocket_endpoint(ws: WebSocket):
                         session_id=session_id,
                         transcript=transcript,
                         summary=summary,
-                        decisions=decisions,
-                        actions=actions,
-                        diarization=diarization,
+                        decisions=artifacts.get("decisions", ""),
+                        actions=artifacts.get("actions", ""),
+                        diarization=artifacts.get("diarization", ""),
                     )
                 except Exception as e:
                     print("Erro ao salvar reunião:", e)
 
-                # manda o resumo pro frontend
                 await ws.send_text(
-                    json.dumps({"type": "summary", "answer": summary})
+                    json.dumps(
+                        {"type": "info", "answer": "✅ Reunião encerrada e salva."}
+                    )
                 )
                 continue
 
@@ -538,12 +911,13 @@ async def websocket_endpoint(ws: WebSocket):
             # ---------------------------------
             if text:
                 if meeting_id is None:
-                    meeting_id = create_meeting(
-                        user_id,
+                    meeting_id = await create_meeting(
+                        ident.user_id,
                         title="Reunião via WebSocket",
                         source="local",
+                        workspace_id=ident.workspace_id,
                     )
-                    active_sessions[session_id] = meeting_id
+                    await run_db(session_store.bind_meeting, session_id, meeting_id)
                     await ws.send_text(
                         json.dumps(
                             {
@@ -555,15 +929,23 @@ async def websocket_endpoint(ws: WebSocket):
 
                 # registra sempre (Orlem está ouvindo)
                 append_to_log(session_id, "user", text)
-                add_message(meeting_id, "user", text)
+                record_message(meeting_id, "user", text, ident.workspace_id)
 
-                lower_text = text.lower()
-                if "orlem" not in lower_text:
+                if not mentions_orlem(text):
                     # só ouvindo; não responde
                     continue
 
                 # aqui ele realmente responde
-                answer = await ask_orlem(text)
+                # com "stream": true, os pedaços chegam como "answer_delta"
+                # e o frame "answer" final continua vindo no fim
+                on_delta = None
+                if payload.get("stream"):
+                    async def on_delta(delta: str):
+                        await ws.send_text(
+                            json.dumps({"type": "answer_delta", "delta": delta})
+                        )
+
+                answer = await ask_orlem(text, on_delta=on_delta, session_id=session_id)
                 if answer is None:
                     continue
 
@@ -579,7 +961,7 @@ async def websocket_endpoint(ws: WebSocket):
                     continue
 
                 append_to_log(session_id, "orlem", answer)
-                add_message(meeting_id, "orlem", answer)
+                record_message(meeting_id, "orlem", answer, ident.workspace_id)
 
                 await ws.send_text(
                     json.dumps({"type": "answer", "answer": answer})
@@ -626,8 +1008,6 @@ async def stt_endpoint(
             detail="Nenhum arquivo de áudio enviado."
         )
 
-    tmp_path: Optional[str] = None
-
     try:
         suffix = ".webm"
         filename = (upload.filename or "").lower()
@@ -638,43 +1018,33 @@ async def stt_endpoint(
         elif filename.endswith(".wav"):
             suffix = ".wav"
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(await upload.read())
-            tmp_path = tmp.name
-
-        with open(tmp_path, "rb") as f:
-            resp = client.audio.transcriptions.create(
-                model="gpt-4o-mini-transcribe",
-                file=f,
-                response_format="json",
-            )
-
-        text = ""
-        if isinstance(resp, dict):
-            text = resp.get("text", "") or ""
-        else:
-            text = getattr(resp, "text", "") or ""
+        # backend configurável (API, gravação/replay de cassete ou fake)
+        text = await llm.transcribe(await upload.read(), filename="audio" + suffix)
         text = (text or "").strip()
 
         if text:
-            meeting_id = active_sessions.get(session_id)
+            meeting_id = await run_db(session_store.get_meeting, session_id)
             if meeting_id is not None:
+                if session_store.due_for_touch(session_id):
+                    await run_db(session_store.touch, session_id)
                 append_to_log(session_id, "user-voice", text)
-                add_message(meeting_id, "user", text)
+                record_message(meeting_id, "user", text)
 
         return {"text": text}
 
+    except UpstreamUnavailable as e:
+        # STT fora do ar: falha rápido e o front pede pra digitar
+        print("STT indisponível:", e)
+        return {
+            "text": "",
+            "error": "Transcrição indisponível no momento.",
+            "fallback": "typing",
+        }
+
     except Exception as e:
         print("ERRO /stt:", repr(e))
         return {"error": f"Erro ao transcrever: {e}"}
 
-    finally:
-        if tmp_path:
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
-
 
 # =========================================
 # TTS / FALA DO ORLEM
@@ -686,16 +1056,19 @@ async def speak_endpoint(payload: dict):
         return {"error": "Texto vazio"}
 
     try:
-        speech = client.audio.speech.create(
-            model="gpt-4o-mini-tts",
-            voice="coral",
-            input=text,
-        )
-        audio_bytes = speech.read()
+        audio_bytes = await llm.speech(text)
         return StreamingResponse(
             io.BytesIO(audio_bytes),
             media_type="audio/mpeg",
         )
+    except UpstreamUnavailable as e:
+        # TTS fora do ar: o front fala com a voz do navegador
+        print("TTS indisponível:", e)
+        return {
+            "error": "Voz indisponível no momento",
+            "fallback": "browser_tts",
+            "text": text,
+        }
     except Exception as e:
         print("ERRO /speak:", e)
         return {
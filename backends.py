@@ -0,0 +1,487 @@
+"""
+ORLEM — backends de IA plugáveis (chat, embeddings, transcrição e voz).
+
+O llm.py fala com um Backend; qual backend é decide ORLEM_BACKEND:
+
+- openai  (padrão)  API de verdade
+- record            API de verdade + grava cada resposta num cassete (JSON) em
+                    ORLEM_CASSETTE_DIR, com os tempos medidos
+- replay            devolve o cassete gravado, sem rede. Pedido sem cassete cai
+                    no fake (ou dá erro com ORLEM_REPLAY_STRICT=1)
+- fake              respostas sintéticas, sem rede e sem chave
+
+No replay e no fake a latência é simulada:
+- ORLEM_FAKE_LATENCY       distribuição do tempo até o 1º token / da chamada:
+                           "fixed:0.3", "uniform:0.2,0.8", "normal:0.5,0.1",
+                           "lognormal:0.5,0.4" (mediana, sigma) ou "none".
+                           No replay, "recorded" (padrão) usa os tempos gravados.
+- ORLEM_FAKE_TOKENS_PER_S  vazão do stream depois do 1º token (padrão 60; 0 = instantâneo)
+- ORLEM_FAKE_SEED          semente do sorteio (benchmarks reprodutíveis)
+
+Assim dá pra medir WebSocket/STT/TTS inteiros numa máquina offline.
+
+Os embeddings do fake são "feature hashing" das palavras: sem semântica, mas
+falas com as mesmas palavras ficam próximas (dá pra testar a busca offline).
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+BACKEND = os.getenv("ORLEM_BACKEND", "openai").lower()
+CASSETTE_DIR = os.getenv("ORLEM_CASSETTE_DIR", "cassettes")
+FAKE_LATENCY = os.getenv("ORLEM_FAKE_LATENCY", "")
+FAKE_TOKENS_PER_S = float(os.getenv("ORLEM_FAKE_TOKENS_PER_S", "60"))
+FAKE_SEED = os.getenv("ORLEM_FAKE_SEED")
+REPLAY_STRICT = os.getenv("ORLEM_REPLAY_STRICT", "0") == "1"
+
+# "calls:<tipo>", "recorded", "replay_hits", "replay_misses"
+BACKEND_STATS: Counter = Counter()
+
+
+# ---------------------------------------------------------
+# Interface
+# ---------------------------------------------------------
+class Backend(ABC):
+    """O que o Orlem precisa de um provedor de IA."""
+
+    name = "base"
+
+    @abstractmethod
+    async def chat(self, model: str, messages: List[Dict[str, Any]], **kwargs: Any) -> str:
+        ...
+
+    @abstractmethod
+    def chat_stream(self, model: str, messages: List[Dict[str, Any]], **kwargs: Any) -> AsyncIterator[str]:
+        ...
+
+    @abstractmethod
+    async def embed(self, model: str, texts: List[str], dimensions: int) -> List[List[float]]:
+        ...
+
+    @abstractmethod
+    async def transcribe(self, model: str, audio: bytes, filename: str) -> str:
+        ...
+
+    @abstractmethod
+    async def speech(self, model: str, voice: str, text: str) -> bytes:
+        ...
+
+    async def aclose(self) -> None:
+        pass
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, **dict(BACKEND_STATS)}
+
+
+# ---------------------------------------------------------
+# OpenAI
+# ---------------------------------------------------------
+class OpenAIBackend(Backend):
+    """API de verdade, usando o cliente único do llm (pool compartilhado)."""
+
+    name = "openai"
+
+    def __init__(self, get_client):
+        self._get_client = get_client
+
+    async def chat(self, model, messages, **kwargs):
+        BACKEND_STATS["calls:chat"] += 1
+        resp = await self._get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            **kwargs,
+        )
+        return resp.choices[0].message.content or ""
+
+    async def chat_stream(self, model, messages, **kwargs):
+        BACKEND_STATS["calls:chat_stream"] += 1
+        stream = await self._get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **kwargs,
+        )
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            await stream.close()
+
+    async def embed(self, model, texts, dimensions):
+        BACKEND_STATS["calls:embed"] += 1
+        resp = await self._get_client().embeddings.create(
+            model=model,
+            input=texts,
+            dimensions=dimensions,
+        )
+        return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+    async def transcribe(self, model, audio, filename):
+        BACKEND_STATS["calls:transcribe"] += 1
+        resp = await self._get_client().audio.transcriptions.create(
+            model=model,
+            file=(filename, audio),
+            response_format="json",
+        )
+        if isinstance(resp, dict):
+            return resp.get("text", "") or ""
+        return getattr(resp, "text", "") or ""
+
+    async def speech(self, model, voice, text):
+        BACKEND_STATS["calls:speech"] += 1
+        resp = await self._get_client().audio.speech.create(
+            model=model,
+            voice=voice,
+            input=text,
+        )
+        return await resp.aread()
+
+
+# ---------------------------------------------------------
+# Latência simulada
+# ---------------------------------------------------------
+class LatencyModel:
+    """Sorteia latências (segundos) a partir de uma especificação em texto."""
+
+    KINDS = ("none", "fixed", "uniform", "normal", "lognormal", "recorded")
+
+    def __init__(self, spec: str = "none", seed: Optional[str] = None):
+        kind, _, args = (spec or "none").partition(":")
+        self.kind = kind.strip().lower() or "none"
+        if self.kind not in self.KINDS:
+            raise ValueError(f"latência desconhecida: {spec!r} (use {', '.join(self.KINDS)})")
+        self.params = [float(a) for a in args.split(",") if a.strip()]
+        self.spec = spec
+        self._rng = random.Random(seed)
+
+    def sample(self, recorded: Optional[float] = None) -> float:
+        p = self.params
+        if self.kind == "recorded":
+            return max(0.0, recorded or 0.0)
+        if self.kind == "fixed":
+            return p[0]
+        if self.kind == "uniform":
+            return self._rng.uniform(p[0], p[1])
+        if self.kind == "normal":
+            return max(0.0, self._rng.gauss(p[0], p[1]))
+        if self.kind == "lognormal":
+            return self._rng.lognormvariate(math.log(p[0]), p[1])
+        return 0.0
+
+
+def _tokens(text: str) -> List[str]:
+    # ~4 caracteres por token, como no resto do Orlem
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+# ---------------------------------------------------------
+# Fake
+# ---------------------------------------------------------
+_FAKE_WORDS = (
+    "reunião prazo entrega equipe cliente decisão tarefa próximo passo sprint "
+    "deploy revisão escopo orçamento responsável alinhamento risco bloqueio"
+).split()
+
+_FAKE_EMBED_WORD = re.compile(r"\w{3,}")
+
+# 1 quadro MP3 (MPEG-1 Layer III, 128 kbps, 44.1 kHz, mono) de silêncio ≈ 26 ms
+_MP3_SILENT_FRAME = b"\xff\xfb\x90\xc4" + b"\x00" * 413
+
+
+class FakeBackend(Backend):
+    """Respostas sintéticas com latência e vazão configuráveis."""
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        tokens_per_s: float = FAKE_TOKENS_PER_S,
+        seed: Optional[str] = FAKE_SEED,
+    ):
+        self.latency = latency or LatencyModel(FAKE_LATENCY or "lognormal:0.5,0.4", seed)
+        self.tokens_per_s = tokens_per_s
+        self._rng = random.Random(seed)
+
+    def fake_text(self, messages: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> str:
+        n = min(max_tokens or 120, 400)
+        words = [self._rng.choice(_FAKE_WORDS) for _ in range(n * 4 // 7)]
+        body = " ".join(words)
+        return f"Resposta simulada ({len(messages)} mensagens): {body}."
+
+    async def _play(self, text: str, recorded_latency: Optional[float] = None) -> AsyncIterator[str]:
+        await asyncio.sleep(self.latency.sample(recorded_latency))
+        delay = 1.0 / self.tokens_per_s if self.tokens_per_s else 0.0
+        for tok in _tokens(text):
+            if delay:
+                await asyncio.sleep(delay)
+            yield tok
+
+    async def chat(self, model, messages, **kwargs):
+        BACKEND_STATS["calls:chat"] += 1
+        return "".join([t async for t in self._play(self.fake_text(messages, kwargs.get("max_tokens")))])
+
+    async def chat_stream(self, model, messages, **kwargs):
+        BACKEND_STATS["calls:chat_stream"] += 1
+        async for tok in self._play(self.fake_text(messages, kwargs.get("max_tokens"))):
+            yield tok
+
+    @staticmethod
+    def fake_embedding(text: str, dimensions: int) -> List[float]:
+        vec = [0.0] * dimensions
+        for word in _FAKE_EMBED_WORD.findall((text or "").lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % dimensions] += 1.0 if (h >> 63) else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    async def embed(self, model, texts, dimensions):
+        BACKEND_STATS["calls:embed"] += 1
+        await asyncio.sleep(self.latency.sample() / 4)
+        return [self.fake_embedding(t, dimensions) for t in texts]
+
+    async def transcribe(self, model, audio, filename):
+        BACKEND_STATS["calls:transcribe"] += 1
+        await asyncio.sleep(self.latency.sample())
+        return os.getenv("ORLEM_FAKE_TRANSCRIPT", "Orlem, qual o próximo passo da reunião?")
+
+    async def speech(self, model, voice, text):
+        BACKEND_STATS["calls:speech"] += 1
+        await asyncio.sleep(self.latency.sample())
+        # ~15 caracteres por segundo de fala, ~38 quadros por segundo
+        frames = max(1, int(len(text) / 15 * 38))
+        return _MP3_SILENT_FRAME * frames
+
+
+# ---------------------------------------------------------
+# Cassetes (record / replay)
+# ---------------------------------------------------------
+def cassette_key(kind: str, request: Dict[str, Any]) -> str:
+    raw = json.dumps({"kind": kind, **request}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _chat_request(model: str, messages: List[Dict[str, Any]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {"model": model, "messages": messages, "kwargs": kwargs}
+
+
+def _embed_request(model: str, texts: List[str], dimensions: int) -> Dict[str, Any]:
+    return {"model": model, "input": texts, "dimensions": dimensions}
+
+
+def _audio_request(model: str, audio: bytes, filename: str) -> Dict[str, Any]:
+    return {"model": model, "audio_sha256": hashlib.sha256(audio).hexdigest()}
+
+
+def _speech_request(model: str, voice: str, text: str) -> Dict[str, Any]:
+    return {"model": model, "voice": voice, "input": text}
+
+
+class CassetteStore:
+    """Um arquivo JSON por pedido: <dir>/<tipo>-<sha256>.json."""
+
+    def __init__(self, directory: str = CASSETTE_DIR):
+        self.directory = directory
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.directory, f"{kind}-{key}.json")
+
+    def load(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(kind, key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, kind: str, key: str, data: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(kind, key)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"kind": kind, "key": key, **data}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+
+class RecordingBackend(Backend):
+    """Passa tudo pro backend real e grava resposta + tempos em cassete."""
+
+    name = "record"
+
+    def __init__(self, inner: Backend, store: Optional[CassetteStore] = None):
+        self.inner = inner
+        self.store = store or CassetteStore()
+
+    def _save(self, kind: str, request: Dict[str, Any], **data: Any) -> None:
+        self.store.save(kind, cassette_key(kind, request), {"request": request, **data})
+        BACKEND_STATS["recorded"] += 1
+
+    async def chat(self, model, messages, **kwargs):
+        t0 = time.monotonic()
+        text = await self.inner.chat(model, messages, **kwargs)
+        self._save("chat", _chat_request(model, messages, kwargs), text=text, latency_s=time.monotonic() - t0)
+        return text
+
+    async def chat_stream(self, model, messages, **kwargs):
+        t0 = time.monotonic()
+        first: Optional[float] = None
+        parts: List[str] = []
+        complete = False
+        try:
+            async for delta in self.inner.chat_stream(model, messages, **kwargs):
+                if first is None:
+                    first = time.monotonic() - t0
+                parts.append(delta)
+                yield delta
+            complete = True
+        finally:
+            # stream cortado no meio (guarda de formato etc.) não vira cassete
+            if complete:
+                total = time.monotonic() - t0
+                text = "".join(parts)
+                self._save(
+                    "chat",
+                    _chat_request(model, messages, kwargs),
+                    text=text,
+                    latency_s=first or total,
+                    tokens_per_s=(len(_tokens(text)) / (total - first)) if first and total > first else 0.0,
+                )
+
+    async def embed(self, model, texts, dimensions):
+        t0 = time.monotonic()
+        vectors = await self.inner.embed(model, texts, dimensions)
+        self._save("embed", _embed_request(model, texts, dimensions), vectors=vectors, latency_s=time.monotonic() - t0)
+        return vectors
+
+    async def transcribe(self, model, audio, filename):
+        t0 = time.monotonic()
+        text = await self.inner.transcribe(model, audio, filename)
+        self._save("transcribe", _audio_request(model, audio, filename), text=text, latency_s=time.monotonic() - t0)
+        return text
+
+    async def speech(self, model, voice, text):
+        t0 = time.monotonic()
+        audio = await self.inner.speech(model, voice, text)
+        self._save(
+            "speech",
+            _speech_request(model, voice, text),
+            audio_b64=base64.b64encode(audio).decode("ascii"),
+            latency_s=time.monotonic() - t0,
+        )
+        return audio
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ReplayBackend(FakeBackend):
+    """Devolve os cassetes gravados, com latência simulada; sem rede."""
+
+    name = "replay"
+
+    def __init__(
+        self,
+        store: Optional[CassetteStore] = None,
+        latency: Optional[LatencyModel] = None,
+        tokens_per_s: float = FAKE_TOKENS_PER_S,
+        strict: bool = REPLAY_STRICT,
+        seed: Optional[str] = FAKE_SEED,
+    ):
+        super().__init__(latency or LatencyModel(FAKE_LATENCY or "recorded", seed), tokens_per_s, seed)
+        self.store = store or CassetteStore()
+        self.strict = strict
+
+    def _lookup(self, kind: str, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = cassette_key(kind, request)
+        data = self.store.load(kind, key)
+        if data is None:
+            BACKEND_STATS["replay_misses"] += 1
+            if self.strict:
+                raise KeyError(f"cassete não encontrado: {kind}-{key}")
+            return None
+        BACKEND_STATS["replay_hits"] += 1
+        return data
+
+    def _tokens_per_s(self, data: Dict[str, Any]) -> float:
+        if self.latency.kind == "recorded" and data.get("tokens_per_s"):
+            return data["tokens_per_s"]
+        return self.tokens_per_s
+
+    async def _replay_text(self, data: Dict[str, Any]) -> AsyncIterator[str]:
+        await asyncio.sleep(self.latency.sample(data.get("latency_s")))
+        tps = self._tokens_per_s(data)
+        for tok in _tokens(data.get("text", "")):
+            if tps:
+                await asyncio.sleep(1.0 / tps)
+            yield tok
+
+    async def chat(self, model, messages, **kwargs):
+        data = self._lookup("chat", _chat_request(model, messages, kwargs))
+        if data is None:
+            return await super().chat(model, messages, **kwargs)
+        BACKEND_STATS["calls:chat"] += 1
+        return "".join([t async for t in self._replay_text(data)])
+
+    async def chat_stream(self, model, messages, **kwargs):
+        data = self._lookup("chat", _chat_request(model, messages, kwargs))
+        if data is None:
+            async for tok in super().chat_stream(model, messages, **kwargs):
+                yield tok
+            return
+        BACKEND_STATS["calls:chat_stream"] += 1
+        async for tok in self._replay_text(data):
+            yield tok
+
+    async def embed(self, model, texts, dimensions):
+        data = self._lookup("embed", _embed_request(model, texts, dimensions))
+        if data is None:
+            return await super().embed(model, texts, dimensions)
+        BACKEND_STATS["calls:embed"] += 1
+        await asyncio.sleep(self.latency.sample(data.get("latency_s")))
+        return data.get("vectors", [])
+
+    async def transcribe(self, model, audio, filename):
+        data = self._lookup("transcribe", _audio_request(model, audio, filename))
+        if data is None:
+            return await super().transcribe(model, audio, filename)
+        BACKEND_STATS["calls:transcribe"] += 1
+        await asyncio.sleep(self.latency.sample(data.get("latency_s")))
+        return data.get("text", "")
+
+    async def speech(self, model, voice, text):
+        data = self._lookup("speech", _speech_request(model, voice, text))
+        if data is None:
+            return await super().speech(model, voice, text)
+        BACKEND_STATS["calls:speech"] += 1
+        await asyncio.sleep(self.latency.sample(data.get("latency_s")))
+        return base64.b64decode(data.get("audio_b64", ""))
+
+
+# ---------------------------------------------------------
+# Fábrica
+# ---------------------------------------------------------
+def make_backend(kind: str, get_client) -> Backend:
+    """Monta o backend pelo nome (ver ORLEM_BACKEND)."""
+    kind = (kind or "openai").lower()
+    if kind == "openai":
+        return OpenAIBackend(get_client)
+    if kind == "record":
+        return RecordingBackend(OpenAIBackend(get_client))
+    if kind == "replay":
+        return ReplayBackend()
+    if kind == "fake":
+        return FakeBackend()
+    raise ValueError(f"ORLEM_BACKEND desconhecido: {kind!r} (use openai, record, replay ou fake)")
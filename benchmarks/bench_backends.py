@@ -0,0 +1,177 @@
+"""
+Benchmark (e conferência) dos bancos suportados pelo db.py: SQLite e PostgreSQL.
+
+Para cada DATABASE_URL, num processo próprio:
+1. roda as funções do db.py/sessions/cache/export de ponta a ponta num banco
+   vazio e confere os resultados (mesmo código nos dois bancos)
+2. N processos (como N workers do uvicorn) gravando falas ao mesmo tempo, cada
+   um nas suas reuniões, uma transação por fala: vazão e falas que falharam
+   (ex.: "database is locked" no SQLite)
+
+O SQLite vai para um diretório temporário (o orlem.db do projeto não é tocado).
+O PostgreSQL precisa de um banco vazio (as tabelas são criadas nele):
+
+    python benchmarks/bench_backends.py
+    python benchmarks/bench_backends.py --pg postgresql://postgres@localhost:5432/orlem_bench
+    python benchmarks/bench_backends.py --pg "postgresql://postgres@/orlem?host=/tmp/pgdata" --workers 16
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def check_functions() -> bool:
+    """
+    Caminho feliz das funções do banco; AssertionError se algo diverge.
+    Retorna se a busca ignora acentos.
+    """
+    import db
+    from cache import ResponseCache
+    from export import export_chunks
+    from sessions import SQLiteSessionStore
+
+    db.init_db()
+    user_id, workspace_id = db.ensure_default_identity()
+    assert db.ensure_default_identity() == (user_id, workspace_id)
+
+    mid = db.create_meeting(user_id, title="Planejamento da sprint", workspace_id=workspace_id)
+    other = db.create_meeting(user_id, title="Revisão com o cliente", workspace_id=workspace_id)
+    first = db.add_message(mid, "user", "a decisão é entregar o deploy na sexta")
+    ids = db.add_messages(
+        [{"meeting_id": mid, "role": "user", "content": f"fala {i} sobre o orçamento", "meta_json": None} for i in range(5)]
+    )
+    assert ids == sorted(ids) and ids[0] > first
+
+    msgs = db.get_meeting_messages(mid)
+    assert [m["id"] for m in msgs] == [first] + ids
+    assert [m["id"] for m in db.get_meeting_messages(mid, limit=2)] == ids[-2:]
+    assert [m["id"] for m in db.get_meeting_messages(mid, limit=2, before_id=ids[-2])] == ids[-4:-2]
+    assert [m["id"] for m in db.get_meeting_messages(mid, since_id=ids[2])] == ids[3:]
+    assert [m["id"] for m in db.list_meetings(user_id, limit=1)] == [other]
+    assert db.get_last_meeting(user_id)["id"] == other
+    assert db.get_meeting_workspace(mid) == workspace_id
+    assert [m["id"] for m in db.get_messages_by_ids([ids[1], first])] == [ids[1], first]
+    assert [r["id"] for r in db.list_messages_after(first, limit=2)] == ids[:2]
+
+    found = db.search_messages("decis entreg")
+    assert [r["id"] for r in found["results"]] == [first], found
+    assert "<mark>" in found["results"][0]["snippet"]
+    page = db.search_messages("orçamento", limit=3)
+    rest = db.search_messages("orçamento", limit=3, cursor=page["next_cursor"])
+    assert len(page["results"]) == 3 and len(rest["results"]) == 2 and rest["next_cursor"] is None
+    assert [r["id"] for r in db.search_meetings("revisão")["results"]] == [other]
+
+    db.save_summary_state(mid, "resumo", ids[-1])
+    assert db.get_summary_state(mid)["last_message_id"] == ids[-1]
+    extra = db.finalize_meeting(mid, {"summary": "r", "decisions": "d"}, messages=[("orlem", "[RESUMO] r")], summary_checkpoint=ids[-1])
+    assert db.get_meeting_artifacts(mid) == {"summary": "r", "decisions": "d"} and len(extra) == 1
+    db.save_reprocess_item("bench", mid, "done", attempts=1)
+    assert db.get_reprocess_state("bench") == {mid: "done"}
+    assert db.reset_reprocess_run("bench") == 1
+    assert db.list_meeting_ids(status="closed") == [mid]
+
+    store = SQLiteSessionStore()
+    store.bind_meeting("bench", mid)
+    store.set_tone("bench", "cliente")
+    assert store.get_meeting("bench") == mid and store.get_tone("bench") == "cliente"
+
+    cache = ResponseCache()
+    cache.put("k" * 64, "modelo", "resposta")
+    cache._mem.clear()
+    assert cache.get("k" * 64) == "resposta"
+
+    lines = b"".join(export_chunks(type="messages", format="ndjson", meeting_id=mid)).splitlines()
+    assert [json.loads(x)["id"] for x in lines] == [first] + ids + extra
+
+    # sem acento acha com acento (PostgreSQL: só com a extensão unaccent)
+    return bool(db.search_messages("decisao")["results"])
+
+
+def writer(args: Tuple[int, int]) -> Tuple[int, int]:
+    """Processo escritor: `lines` falas numa reunião própria. Retorna (ok, falhas)."""
+    n, lines = args
+    import db
+
+    meeting_id = db.create_meeting(1, title=f"bench {n}")
+    ok = failed = 0
+    for i in range(lines):
+        try:
+            db.add_message(meeting_id, "user", f"worker {n}, fala {i}: vamos fechar o prazo da entrega")
+            ok += 1
+        except Exception:
+            failed += 1
+    db.engine.dispose()
+    return ok, failed
+
+
+def child(workers: int, lines: int) -> None:
+    import db
+
+    t0 = time.perf_counter()
+    unaccent = check_functions()
+    checked_s = time.perf_counter() - t0
+
+    ctx = multiprocessing.get_context("spawn")  # engine novo em cada processo
+    with ctx.Pool(workers) as pool:
+        pool.map(writer, [(n, 1) for n in range(workers)])  # sobe os processos antes de medir
+        t0 = time.perf_counter()
+        results: List[Tuple[int, int]] = pool.map(writer, [(n, lines) for n in range(workers)])
+        elapsed = time.perf_counter() - t0
+    print(json.dumps({
+        "backend": db.engine.dialect.name,
+        "check_s": checked_s,
+        "unaccent": unaccent,
+        "elapsed_s": elapsed,
+        "ok": sum(r[0] for r in results),
+        "failed": sum(r[1] for r in results),
+    }))
+
+
+def run(url: str, args) -> Dict:
+    env = dict(os.environ, DATABASE_URL=url)
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", "--workers", str(args.workers), "--lines", str(args.lines)],
+        cwd=tempfile.mkdtemp(prefix="orlem-bench-"),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if out.returncode != 0:
+        raise SystemExit(f"{url}: falhou\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pg", default=os.getenv("ORLEM_BENCH_PG_URL"), help="URL de um PostgreSQL vazio")
+    ap.add_argument("--workers", type=int, default=8, help="processos gravando ao mesmo tempo")
+    ap.add_argument("--lines", type=int, default=200, help="falas por processo")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(args.workers, args.lines)
+        return
+
+    urls = ["sqlite:///orlem.db"] + ([args.pg] if args.pg else [])
+    print(f"{args.workers} processos x {args.lines} falas (uma transação por fala)")
+    print(f"{'banco':<12} {'funções':>8} {'sem acento':>11} {'tempo (s)':>10} {'falas/s':>10} {'falhas':>8}")
+    for url in urls:
+        r = run(url, args)
+        print(f"{r['backend']:<12} {'ok':>8} {'sim' if r['unaccent'] else 'não':>11} {r['elapsed_s']:>10.2f} {r['ok'] / r['elapsed_s']:>10.0f} {r['failed']:>8}")
+    if not args.pg:
+        print("(sem --pg/ORLEM_BENCH_PG_URL: só SQLite)")
+
+
+if __name__ == "__main__":
+    main()
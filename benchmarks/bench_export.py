@@ -0,0 +1,81 @@
+"""
+Benchmark da exportação: pico de memória e vazão do export em streaming
+(export.py) contra o jeito antigo (lista de dicts de todas as mensagens e um
+json.dumps no fim), para históricos de tamanhos diferentes.
+
+Cada tamanho roda num processo e num banco novos num diretório temporário (o
+orlem.db do projeto não é tocado). Tempo medido sem tracemalloc; memória numa
+segunda execução com tracemalloc (pico de alocações Python).
+
+Uso:
+    python benchmarks/bench_export.py
+    python benchmarks/bench_export.py --sizes 100000 1000000 --gzip
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(fn) -> Dict[str, float]:
+    t0 = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"s": elapsed, "peak_mb": peak / 1e6, "bytes": size}
+
+
+def child(messages: int, gzip: bool) -> None:
+    import db
+    from bench_queries import populate
+    from export import export_chunks
+
+    db.init_db()
+    populate("orlem.db", messages, per_meeting=200)
+
+    def old_way() -> int:
+        # como as outras funções do db.py: resultado inteiro numa lista, serializa no fim
+        rows = [r for batch in db.stream_messages(batch=messages + 1) for r in batch]
+        return len("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows).encode("utf-8"))
+
+    def streaming() -> int:
+        return sum(len(c) for c in export_chunks(type="messages", format="ndjson", gzip=gzip))
+
+    print(json.dumps({"lista": measure(old_way), "streaming": measure(streaming)}))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 300000])
+    ap.add_argument("--gzip", action="store_true", help="streaming com gzip")
+    ap.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child is not None:
+        child(args.child, args.gzip)
+        return
+
+    print(f"{'mensagens':>10} {'modo':<10} {'tempo (s)':>10} {'linhas/s':>10} {'pico (MB)':>10} {'saída (MB)':>11}")
+    for size in args.sizes:
+        cmd = [sys.executable, __file__, "--child", str(size)] + (["--gzip"] if args.gzip else [])
+        out = subprocess.run(cmd, cwd=tempfile.mkdtemp(prefix="orlem-bench-"), capture_output=True, text=True, check=True)
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        for mode, r in res.items():
+            print(f"{size:>10} {mode:<10} {r['s']:>10.2f} {size / r['s']:>10.0f} {r['peak_mb']:>10.1f} {r['bytes'] / 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
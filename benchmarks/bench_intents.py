@@ -0,0 +1,127 @@
+"""
+Benchmark do roteador de intenções (brain.INTENT_ROUTER) contra o caminho antigo
+(20 detectores is_* para is_command + a cadeia de despacho rodando de novo).
+
+Uso:
+    python benchmarks/bench_intents.py
+    python benchmarks/bench_intents.py --sizes 500 5000 50000 --repeat 50
+
+Não chama a API: só mede detecção de intenção em transcrições longas de STT.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import brain  # noqa: E402
+
+# frases típicas de STT de reunião (sem pontuação, caixa misturada)
+FRASES = [
+    "então pessoal a gente precisa alinhar o prazo da entrega",
+    "o cliente pediu mais uma tela no painel e isso não estava no escopo",
+    "acho que dá pra fechar a sprint até sexta se ninguém travar",
+    "Orlem anota aí que o João fica com o deploy",
+    "eu vi o ticket do suporte ontem mas ainda não consegui olhar",
+    "a gente pode mandar a proposta revisada amanhã cedo",
+    "precisa ver a questão da lgpd antes de gravar as calls",
+    "bom dia a todos vamos começar",
+    "quais são os próximos passos pra semana que vem",
+    "vou compartilhar a tela aqui rapidinho",
+    "o orçamento do trimestre ficou apertado",
+    "alguém tem alternativas pra esse fluxo de onboarding",
+]
+
+# ordem do despacho antigo em ask_orlem
+LEGACY_CHAIN = [
+    brain.is_client_message, brain.is_delay, brain.is_summary, brain.is_decisions,
+    brain.is_actions, brain.is_conflict, brain.is_standup, brain.is_taskify,
+    brain.is_sales, brain.is_support, brain.is_security, brain.is_hiring,
+    brain.is_retro, brain.is_scope_change, brain.is_budget, brain.is_email,
+    brain.is_whatsapp, brain.is_brainstorm, brain.is_okr, brain.is_training,
+]
+
+
+def legacy_route(low: str):
+    """O que o ask_orlem antigo fazia: any(20 is_*) e depois a cadeia if/if/if."""
+    is_command = any([f(low) for f in LEGACY_CHAIN])
+    greeting = brain.is_greeting(low)
+    brainstorm = brain.is_brainstorm(low)
+    first = None
+    for f in LEGACY_CHAIN:
+        if f(low):
+            first = f.__name__[3:]
+            break
+    return is_command, greeting, brainstorm, first
+
+
+def router_route(low: str):
+    intents = brain.INTENT_ROUTER.match(low)
+    commands = [n for n in intents if n in brain.COMMAND_HANDLERS]
+    return bool(commands), "greeting" in intents, "brainstorm" in intents, (commands[0] if commands else None)
+
+
+def make_transcript(n_chars: int, rng: random.Random) -> str:
+    parts = []
+    size = 0
+    while size < n_chars:
+        f = rng.choice(FRASES)
+        parts.append(f)
+        size += len(f) + 1
+    return brain._norm(" ".join(parts)[:n_chars])
+
+
+def check_equivalence(rng: random.Random, n: int = 3000) -> None:
+    """Textos aleatórios com pedaços de palavras-chave: as duas rotas precisam bater."""
+    vocab = [kw for _, kws in brain.INTENT_TABLE for kw in kws] + FRASES + ["x", " ", "a", "or", "at"]
+    for _ in range(n):
+        pieces = []
+        for _ in range(rng.randint(1, 8)):
+            w = rng.choice(vocab)
+            if rng.random() < 0.3:
+                i = rng.randint(0, len(w))
+                w = w[:i]
+            pieces.append(w)
+        low = brain._norm(rng.choice(["", " "]).join(pieces))
+        expected = legacy_route(low)
+        got = router_route(low)
+        if expected != got:
+            raise SystemExit(f"divergência em {low!r}: antigo={expected} novo={got}")
+    print(f"equivalência ok em {n} textos aleatórios")
+
+
+def bench(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn(text)
+        best = min(best, (time.perf_counter() - t0) / repeat)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[200, 2_000, 20_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    check_equivalence(rng)
+
+    print(f"{'chars':>8} {'antigo (us)':>12} {'roteador (us)':>14} {'ganho':>7}")
+    for size in args.sizes:
+        text = make_transcript(size, rng)
+        assert legacy_route(text) == router_route(text)
+        t_old = bench(legacy_route, text, args.repeat)
+        t_new = bench(router_route, text, args.repeat)
+        print(f"{size:>8} {t_old * 1e6:>12.1f} {t_new * 1e6:>14.1f} {t_old / t_new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark das consultas quentes do db.py contra o tamanho do histórico:
+get_meeting_messages (uma reunião inteira e a última página de 50),
+list_meetings (página de 50), get_last_meeting e list_meeting_ids(status), sem os
+índices das migrações e depois de aplicá-las no mesmo banco.
+
+Cada tamanho é um banco novo num diretório temporário (o orlem.db do projeto
+não é tocado), com as mensagens espalhadas em reuniões de --per-meeting falas.
+
+Uso:
+    python benchmarks/bench_queries.py
+    python benchmarks/bench_queries.py --sizes 10000 100000 500000 --repeat 50
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+INDEXES = (
+    "ix_messages_meeting_created",
+    "ix_messages_meeting_id",
+    "ix_meetings_created_at",
+    "ix_meetings_status_id",
+    "ix_llm_cache_created_at",
+    "ix_session_states_last_activity",
+)
+
+
+def populate(path: str, messages: int, per_meeting: int) -> int:
+    """Enche o banco direto pelo sqlite3 (rápido); devolve o nº de reuniões."""
+    meetings = max(1, messages // per_meeting)
+    start = datetime(2024, 1, 1)
+    con = sqlite3.connect(path)
+    con.execute("INSERT INTO workspaces (id, name, created_at) VALUES (1, 'bench', ?)", (start,))
+    con.executemany(
+        "INSERT INTO meetings (id, workspace_id, title, source, status, created_at, updated_at)"
+        " VALUES (?, 1, ?, 'local', ?, ?, ?)",
+        (
+            (m, f"reunião {m}", random.choice(("open", "closed", "closed", "archived")),
+             start + timedelta(hours=m), start + timedelta(hours=m))
+            for m in range(1, meetings + 1)
+        ),
+    )
+    # falas intercaladas entre reuniões (como várias calls ao vivo ao mesmo tempo)
+    con.executemany(
+        "INSERT INTO messages (meeting_id, role, content, created_at) VALUES (?, 'user', ?, ?)",
+        (
+            (i % meetings + 1, f"fala {i}: vamos fechar o prazo da entrega", start + timedelta(seconds=i))
+            for i in range(messages)
+        ),
+    )
+    con.commit()
+    con.close()
+    return meetings
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def run_size(messages: int, args) -> Dict[str, Dict[str, float]]:
+    # processo por tamanho: o engine do db.py aponta pro orlem.db do cwd
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", str(messages), "--per-meeting", str(args.per_meeting),
+         "--repeat", str(args.repeat)],
+        cwd=tempfile.mkdtemp(prefix="orlem-bench-"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def child(messages: int, per_meeting: int, repeat: int) -> None:
+    import db
+    import migrations
+    from sqlalchemy import text
+
+    db.init_db()
+    meetings = populate("orlem.db", messages, per_meeting)
+    probe = [random.randint(1, meetings) for _ in range(repeat)]
+
+    queries = {
+        "meeting_messages": lambda: db.get_meeting_messages(random.choice(probe)),
+        "messages_page": lambda: db.get_meeting_messages(random.choice(probe), limit=50),
+        "meetings_page": lambda: db.list_meetings(0, limit=50),
+        "last_meeting": lambda: db.get_last_meeting(0),
+        "meeting_ids_status": lambda: db.list_meeting_ids(status="open"),
+    }
+
+    result: Dict[str, Dict[str, float]] = {}
+    # "sem índice": como um orlem.db criado antes das migrações
+    with db.engine.begin() as conn:
+        for name in INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        conn.execute(text("DELETE FROM schema_migrations"))
+        conn.execute(text("ANALYZE"))
+    result["sem índice"] = {q: timed(fn, repeat) for q, fn in queries.items()}
+
+    t0 = time.perf_counter()
+    migrations.upgrade()
+    migrate_ms = (time.perf_counter() - t0) * 1000
+    result["com índice"] = {q: timed(fn, repeat) for q, fn in queries.items()}
+    result["com índice"]["migração"] = migrate_ms
+    print(json.dumps(result))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 300000])
+    ap.add_argument("--per-meeting", type=int, default=200, help="falas por reunião")
+    ap.add_argument("--repeat", type=int, default=20, help="execuções por consulta (mediana)")
+    ap.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child is not None:
+        child(args.child, args.per_meeting, args.repeat)
+        return
+
+    cols = ("meeting_messages", "messages_page", "meetings_page", "last_meeting", "meeting_ids_status")
+    print(f"mediana em ms ({args.repeat} execuções), {args.per_meeting} falas por reunião")
+    print(f"{'mensagens':>10} {'índices':<11}" + "".join(f"{c:>20}" for c in cols) + f"{'migração':>10}")
+    for size in args.sizes:
+        res = run_size(size, args)
+        for label in ("sem índice", "com índice"):
+            row = res[label]
+            mig = f"{row['migração']:>10.0f}" if "migração" in row else f"{'':>10}"
+            print(f"{size:>10} {label:<11}" + "".join(f"{row[c]:>20.2f}" for c in cols) + mig)
+
+
+if __name__ == "__main__":
+    main()
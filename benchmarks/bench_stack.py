@@ -0,0 +1,134 @@
+"""
+Benchmark do stack inteiro (WebSocket + /stt + /speak) sem rede.
+
+Roda o app em processo com ORLEM_BACKEND=fake (ou replay, com cassetes
+gravados antes com ORLEM_BACKEND=record) e simula N sessões em paralelo:
+cada uma fala com o Orlem pelo WebSocket (stream), manda um áudio pro /stt
+e pede a voz no /speak. Mede tempo até o 1º pedaço, resposta completa,
+STT e TTS (p50/p95/max).
+
+O banco, logs e meetings/ vão para um diretório temporário (o orlem.db do
+projeto não é tocado).
+
+Uso:
+    python benchmarks/bench_stack.py
+    python benchmarks/bench_stack.py --sessions 20 --turns 5 --latency lognormal:0.6,0.4 --tps 50
+    ORLEM_BACKEND=replay ORLEM_CASSETTE_DIR=cassettes python benchmarks/bench_stack.py
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PERGUNTAS = [
+    "Orlem, qual o próximo passo?",
+    "Orlem, resume o que foi decidido até agora",
+    "Orlem, quais os riscos desse prazo?",
+    "Orlem, me ajuda a responder o cliente sobre o escopo",
+]
+
+
+def pct(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+def run_session(client, n: int, turns: int, audio: bytes, out: Dict[str, List[float]]) -> None:
+    session_id = f"bench-{n}"
+    with client.websocket_connect(f"/ws?session_id={session_id}") as ws:
+        ws.receive_json()  # status
+        for t in range(turns):
+            t0 = time.perf_counter()
+            ws.send_text(json.dumps({"text": PERGUNTAS[(n + t) % len(PERGUNTAS)], "stream": True}))
+            first = None
+            while True:
+                frame = ws.receive_json()
+                if frame.get("type") == "answer_delta" and first is None:
+                    first = time.perf_counter() - t0
+                if frame.get("type") == "answer":
+                    break
+            total = time.perf_counter() - t0
+            out["ttft"].append(first if first is not None else total)
+            out["answer"].append(total)
+
+            t0 = time.perf_counter()
+            r = client.post("/stt", files={"file": ("fala.webm", audio, "audio/webm")}, data={"session_id": session_id})
+            r.raise_for_status()
+            out["stt"].append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            r = client.post("/speak", json={"text": frame["answer"][:300]})
+            r.raise_for_status()
+            out["speak"].append(time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=8, help="sessões simultâneas")
+    ap.add_argument("--turns", type=int, default=3, help="perguntas por sessão")
+    ap.add_argument("--latency", default=None, help="ORLEM_FAKE_LATENCY (ex.: lognormal:0.5,0.4)")
+    ap.add_argument("--tps", type=float, default=None, help="ORLEM_FAKE_TOKENS_PER_S")
+    ap.add_argument("--seed", default="42")
+    args = ap.parse_args()
+
+    os.environ.setdefault("ORLEM_BACKEND", "fake")
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("ORLEM_FAKE_SEED", args.seed)
+    os.environ.setdefault("ORLEM_CACHE_ENABLED", "0")  # mede o backend, não o cache
+    if args.latency:
+        os.environ["ORLEM_FAKE_LATENCY"] = args.latency
+    if args.tps is not None:
+        os.environ["ORLEM_FAKE_TOKENS_PER_S"] = str(args.tps)
+    if os.environ.get("ORLEM_CASSETTE_DIR"):
+        os.environ["ORLEM_CASSETTE_DIR"] = os.path.abspath(os.environ["ORLEM_CASSETTE_DIR"])
+
+    # app usa caminhos relativos (orlem.db, logs/, meetings/, web/)
+    workdir = tempfile.mkdtemp(prefix="orlem-bench-")
+    os.symlink(os.path.join(ROOT, "web"), os.path.join(workdir, "web"))
+    os.chdir(workdir)
+
+    from fastapi.testclient import TestClient  # noqa: E402
+    import app  # noqa: E402
+    import llm  # noqa: E402
+
+    audio = os.urandom(16000)
+    out: Dict[str, List[float]] = {"ttft": [], "answer": [], "stt": [], "speak": []}
+
+    print(
+        f"backend={llm.get_backend().name} sessões={args.sessions} turnos={args.turns} "
+        f"latência={os.environ.get('ORLEM_FAKE_LATENCY') or 'padrão'} "
+        f"tokens/s={os.environ.get('ORLEM_FAKE_TOKENS_PER_S', 'padrão')} (dados em {workdir})"
+    )
+    with TestClient(app.app) as client:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            futures = [pool.submit(run_session, client, n, args.turns, audio, out) for n in range(args.sessions)]
+            for f in futures:
+                f.result()
+        wall = time.perf_counter() - t0
+
+    turns = args.sessions * args.turns
+    print(f"{turns} turnos em {wall:.2f}s ({turns / wall:.1f} turnos/s)")
+    print(f"{'métrica':<10} {'p50':>8} {'p95':>8} {'max':>8} {'média':>8}")
+    for name, values in out.items():
+        print(
+            f"{name:<10} {pct(values, 50):>8.3f} {pct(values, 95):>8.3f} "
+            f"{max(values):>8.3f} {statistics.mean(values):>8.3f}"
+        )
+    print("backend:", llm.get_backend().describe())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark do detector de "Orlem": implementação antiga
+(SequenceMatcher por token) contra o WakeWordIndex.
+
+Uso:
+    python benchmarks/bench_wakeword.py
+    python benchmarks/bench_wakeword.py --tokens 200 5000 50000
+
+Também confere, token a token, que as duas versões dão o mesmo resultado.
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wakeword import WakeWordIndex  # noqa: E402
+
+COMMON = {"orlem", "orlen", "orlan", "orlim", "orlém", "orlemh", "orlemn", "orlemr"}
+
+PALAVRAS = (
+    "então pessoal a gente precisa alinhar o prazo da entrega com o cliente "
+    "problema ordem reunião deploy sprint roadmap proposta escopo orçamento "
+    "amanhã semana quinta feira lembra modelo orla olha morel ormel orelha "
+    "valeu obrigado beleza combinado fechado"
+).split()
+
+
+def legacy_token_like_orlem(token: str) -> bool:
+    t = "".join(ch for ch in token.lower() if ch.isalpha())
+    if not t:
+        return False
+    if t in COMMON:
+        return True
+    return SequenceMatcher(None, t, "orlem").ratio() >= 0.6
+
+
+def legacy_is_calling(text: str) -> bool:
+    s = (text or "").lower().strip()
+    if not s:
+        return False
+    if "orlem" in s:
+        return True
+    for tok in s.split():
+        if legacy_token_like_orlem(tok):
+            return True
+    return False
+
+
+def random_token(rng: random.Random) -> str:
+    alphabet = "orlemaiunpdsé" + string.ascii_lowercase
+    n = rng.randint(1, 13)
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def check_equivalence(index: WakeWordIndex, rng: random.Random, n: int) -> None:
+    for _ in range(n):
+        tok = random_token(rng) if rng.random() < 0.8 else rng.choice(PALAVRAS)
+        if rng.random() < 0.1:
+            tok += rng.choice(",.!?")
+        if legacy_token_like_orlem(tok) != index.token_matches(tok):
+            raise SystemExit(f"divergência no token {tok!r}")
+    print(f"equivalência ok em {n} tokens")
+
+
+def make_text(n_tokens: int, rng: random.Random) -> str:
+    # transcrição longa sem chamar o Orlem (pior caso: olha todos os tokens)
+    words = [w for w in PALAVRAS if not legacy_token_like_orlem(w)]
+    return " ".join(rng.choice(words) for _ in range(n_tokens))
+
+
+def bench(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn(text)
+        best = min(best, (time.perf_counter() - t0) / repeat)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tokens", type=int, nargs="+", default=[20, 200, 2_000, 20_000])
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--check", type=int, default=50_000)
+    args = ap.parse_args()
+
+    rng = random.Random(11)
+    index = WakeWordIndex(["orlem"], variants=COMMON, threshold=0.6)
+    check_equivalence(index, rng, args.check)
+
+    print(f"{'tokens':>8} {'antigo (us)':>12} {'índice (us)':>12} {'ganho':>7}")
+    for n in args.tokens:
+        text = make_text(n, rng)
+        assert legacy_is_calling(text) == index.is_called(text)
+        t_old = bench(legacy_is_calling, text, args.repeat)
+        t_new = bench(index.is_called, text, args.repeat)
+        print(f"{n:>8} {t_old * 1e6:>12.1f} {t_new * 1e6:>12.1f} {t_old / t_new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
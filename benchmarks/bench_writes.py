@@ -0,0 +1,93 @@
+"""
+Benchmark da gravação das falas: add_message (uma transação por fala) contra o
+MessageWriter (fila + INSERT em lote).
+
+Simula N sessões falando ao mesmo tempo no event loop e mede quanto o loop
+fica bloqueado (add_message roda no thread do loop) e a vazão total.
+O banco vai para um diretório temporário (o orlem.db do projeto não é tocado).
+
+Uso:
+    python benchmarks/bench_writes.py
+    python benchmarks/bench_writes.py --sessions 50 --lines 40 --batch 200 --delay 0.02
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+async def run_sessions(write, sessions: int, lines: int, meeting_ids: List[int]) -> None:
+    async def session(n: int) -> None:
+        for i in range(lines):
+            await write(meeting_ids[n], "user", f"sessão {n}, fala {i}: vamos fechar o prazo da entrega")
+            await asyncio.sleep(0)  # outras sessões falam no meio
+
+    await asyncio.gather(*(session(n) for n in range(sessions)))
+
+
+async def lag_probe(stop: asyncio.Event, out: List[float]) -> None:
+    # atraso do loop: quanto um sleep(1 ms) demora de fato
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.001)
+        out.append(time.perf_counter() - t0 - 0.001)
+
+
+async def main_async(args) -> None:
+    import db
+    from writebehind import MessageWriter
+
+    db.init_db()
+    user = db.get_or_create_default_user()
+    meeting_ids = [db.create_meeting(user, title=f"bench {n}") for n in range(args.sessions)]
+    total = args.sessions * args.lines
+
+    async def direct(meeting_id, role, content):
+        db.add_message(meeting_id, role, content)
+
+    writer = MessageWriter(mode="batch", max_batch=args.batch, max_delay_s=args.delay)
+
+    async def queued(meeting_id, role, content):
+        writer.add(meeting_id, role, content)
+
+    print(f"{total} falas ({args.sessions} sessões x {args.lines})")
+    print(f"{'modo':<14} {'tempo (s)':>10} {'falas/s':>10} {'lag max (ms)':>13}")
+    for name, write in (("add_message", direct), ("write-behind", queued)):
+        lags: List[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(lag_probe(stop, lags))
+        t0 = time.perf_counter()
+        await run_sessions(write, args.sessions, args.lines, meeting_ids)
+        if write is queued:
+            await writer.close()  # conta até a última fala estar no banco
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await probe
+        print(f"{name:<14} {elapsed:>10.3f} {total / elapsed:>10.0f} {max(lags or [0]) * 1000:>13.1f}")
+
+    print("writer:", writer.stats())
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=20)
+    ap.add_argument("--lines", type=int, default=25)
+    ap.add_argument("--batch", type=int, default=100)
+    ap.add_argument("--delay", type=float, default=0.05)
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="orlem-bench-")
+    os.chdir(workdir)
+    print(f"(dados em {workdir})")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+ORLEM — cache de respostas dos geradores (gen_*).
+
+- Chave: sha256 de (prompt de sistema, contexto normalizado, modelo)
+- Memória: LRU com limite de itens
+- Disco: tabela llm_cache no mesmo SQLite, com TTL
+- Contadores de hit/miss para acompanhar o ganho
+
+Variáveis de ambiente:
+- ORLEM_CACHE_ENABLED    (padrão 1)      0 desliga o cache
+- ORLEM_CACHE_MAX_ITEMS  (padrão 512)    itens mantidos em memória
+- ORLEM_CACHE_TTL        (padrão 86400)  segundos até uma resposta expirar
+- ORLEM_CACHE_PURGE_S    (padrão 3600)   intervalo entre as limpezas do disco
+  (o app chama purge_expired na subida e depois a cada intervalo)
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+from sqlalchemy import select, delete
+
+from db import SessionLocal
+from db_async import run_db
+from models import LLMCache
+
+CACHE_ENABLED = os.getenv("ORLEM_CACHE_ENABLED", "1") != "0"
+CACHE_MAX_ITEMS = int(os.getenv("ORLEM_CACHE_MAX_ITEMS", "512"))
+CACHE_TTL = int(os.getenv("ORLEM_CACHE_TTL", "86400"))
+CACHE_PURGE_S = float(os.getenv("ORLEM_CACHE_PURGE_S", "3600"))
+
+
+def normalize_context(text: str) -> str:
+    """Caixa e espaços não mudam o pedido: 'Resumo  da reunião' == 'resumo da reunião'."""
+    return " ".join((text or "").split()).casefold()
+
+
+class ResponseCache:
+    """LRU em memória na frente de uma tabela SQLite com TTL."""
+
+    def __init__(
+        self,
+        max_items: int = CACHE_MAX_ITEMS,
+        ttl_seconds: int = CACHE_TTL,
+        persist: bool = True,
+    ):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.persist = persist
+        self._mem: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ---------- chave ----------
+    @staticmethod
+    def make_key(messages: List[Dict[str, Any]], model: str) -> str:
+        h = hashlib.sha256()
+        h.update(model.encode("utf-8"))
+        for m in messages:
+            content = m.get("content") or ""
+            if m.get("role") != "system":
+                content = normalize_context(content)
+            h.update(b"\x00" + m.get("role", "").encode("utf-8"))
+            h.update(b"\x00" + content.encode("utf-8"))
+        return h.hexdigest()
+
+    # ---------- leitura ----------
+    def get(self, key: str) -> Optional[str]:
+        value = self._mem_get(key)
+        if value is None and self.persist:
+            value = self._from_disk(key, *self._disk_get(key))
+        if value is None:
+            self.misses += 1
+        return value
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() para o event loop: a LRU fica no loop, só o SQLite vai pro pool do banco."""
+        value = self._mem_get(key)
+        if value is None and self.persist:
+            value = self._from_disk(key, *await run_db(self._disk_get, key))
+        if value is None:
+            self.misses += 1
+        return value
+
+    # ---------- escrita ----------
+    def put(self, key: str, model: str, value: str) -> None:
+        self._remember(key, value, time.time() + self.ttl_seconds)
+        if self.persist:
+            self._disk_put(key, model, value)
+
+    async def aput(self, key: str, model: str, value: str) -> None:
+        self._remember(key, value, time.time() + self.ttl_seconds)
+        if self.persist:
+            await run_db(self._disk_put, key, model, value)
+
+    def clear(self) -> None:
+        self._mem.clear()
+        if self.persist:
+            db = SessionLocal()
+            try:
+                db.execute(delete(LLMCache))
+                db.commit()
+            except Exception as e:
+                print("ERRO cache (clear):", e)
+            finally:
+                db.close()
+
+    def purge_expired(self) -> int:
+        """Apaga do disco as respostas com TTL vencido. Retorna quantas saíram."""
+        if not self.persist:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        db = SessionLocal()
+        try:
+            res = db.execute(delete(LLMCache).where(LLMCache.created_at < cutoff))
+            db.commit()
+            return res.rowcount or 0
+        except Exception as e:
+            print("ERRO cache (purge):", e)
+            return 0
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": CACHE_ENABLED,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_items": len(self._mem),
+            "max_items": self.max_items,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    # ---------- internos ----------
+    def _mem_get(self, key: str) -> Optional[str]:
+        item = self._mem.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.time():
+            del self._mem[key]
+            return None
+        self._mem.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _from_disk(self, key: str, value: Optional[str], created_at: float) -> Optional[str]:
+        if value is None:
+            return None
+        expires_at = created_at + self.ttl_seconds
+        if expires_at <= time.time():
+            return None
+        self._remember(key, value, expires_at)
+        self.hits += 1
+        self.disk_hits += 1
+        return value
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._mem[key] = (value, expires_at)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Tuple[Optional[str], float]:
+        db = SessionLocal()
+        try:
+            row = db.execute(select(LLMCache).where(LLMCache.key == key)).scalars().first()
+            if not row:
+                return None, 0.0
+            # created_at é gravado em UTC (datetime.utcnow)
+            created = (row.created_at - datetime(1970, 1, 1)).total_seconds()
+            return row.response, created
+        except Exception as e:
+            print("ERRO cache (get):", e)
+            return None, 0.0
+        finally:
+            db.close()
+
+    def _disk_put(self, key: str, model: str, value: str) -> None:
+        db = SessionLocal()
+        try:
+            db.merge(LLMCache(key=key, model=model, response=value, created_at=datetime.utcnow()))
+            db.commit()
+        except Exception as e:
+            print("ERRO cache (put):", e)
+        finally:
+            db.close()
+
+
+# cache único do processo (usado pelo brain)
+response_cache = ResponseCache()
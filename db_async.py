@@ -0,0 +1,132 @@
+"""
+ORLEM — acesso ao banco sem travar o event loop.
+
+As funções do db.py são síncronas (SQLAlchemy + sqlite3). Chamadas direto de
+um handler async ou do loop do WebSocket, cada query trava todas as sessões do
+worker enquanto o SQLite trabalha. Aqui elas rodam num pool de threads só do
+banco; o event loop só espera o resultado.
+
+    import db_async as adb
+    msgs = await adb.get_meeting_messages(meeting_id)
+    await adb.run_db(session_store.touch, session_id)   # qualquer função síncrona
+    async for chunk in adb.iterate(export_chunks(...)):  # gerador síncrono (streaming)
+
+Mesmos nomes e argumentos do db.py. Com WAL (ver db.py), as leituras nessas
+threads não esperam as escritas das reuniões ao vivo.
+
+Variáveis de ambiente:
+- ORLEM_DB_THREADS  (padrão 4)  threads do pool do banco
+"""
+
+import asyncio
+import functools
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+import db
+
+DB_THREADS = int(os.getenv("ORLEM_DB_THREADS", "4"))
+
+# "calls", "busy_s" (tempo nas threads), "queued_s" (espera por uma thread livre)
+DB_STATS: Counter = Counter()
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="orlem-db")
+    return _executor
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Roda fn(*args, **kwargs) numa thread do banco e devolve o resultado."""
+    submitted = time.perf_counter()
+
+    def timed() -> T:
+        started = time.perf_counter()
+        DB_STATS["queued_s"] += started - submitted
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            DB_STATS["busy_s"] += time.perf_counter() - started
+
+    DB_STATS["calls"] += 1
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), timed)
+
+
+async def iterate(it: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Consome um gerador síncrono que lê o banco (ex.: export_chunks) com cada
+    next() numa thread do banco. Se quem consome parar antes, o gerador é fechado
+    (e a sessão dele também).
+    """
+    done = object()
+    try:
+        while True:
+            item = await run_db(next, it, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            await run_db(close)
+
+
+def _async(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await run_db(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "threads": DB_THREADS,
+        "calls": DB_STATS["calls"],
+        "busy_s": round(DB_STATS["busy_s"], 3),
+        "queued_s": round(DB_STATS["queued_s"], 3),
+        "backend": db.engine.dialect.name,
+        "pool": db.engine.pool.status(),
+    }
+
+
+def shutdown() -> None:
+    """Espera as queries em andamento e fecha o pool (shutdown do app)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+init_db = _async(db.init_db)
+get_or_create_default_user = _async(db.get_or_create_default_user)
+ensure_default_identity = _async(db.ensure_default_identity)
+create_meeting = _async(db.create_meeting)
+list_meetings = _async(db.list_meetings)
+get_last_meeting = _async(db.get_last_meeting)
+list_meeting_ids = _async(db.list_meeting_ids)
+add_message = _async(db.add_message)
+add_messages = _async(db.add_messages)
+get_meeting_messages = _async(db.get_meeting_messages)
+get_meeting_message_stats = _async(db.get_meeting_message_stats)
+get_messages_by_ids = _async(db.get_messages_by_ids)
+list_messages_after = _async(db.list_messages_after)
+get_meeting_workspace = _async(db.get_meeting_workspace)
+get_summary_state = _async(db.get_summary_state)
+save_summary_state = _async(db.save_summary_state)
+finalize_meeting = _async(db.finalize_meeting)
+get_meeting_artifacts = _async(db.get_meeting_artifacts)
+get_reprocess_state = _async(db.get_reprocess_state)
+save_reprocess_item = _async(db.save_reprocess_item)
+reset_reprocess_run = _async(db.reset_reprocess_run)
+search_messages = _async(db.search_messages)
+search_meetings = _async(db.search_meetings)
@@ -0,0 +1,153 @@
+"""
+ORLEM — exportação em massa de reuniões e transcrições (NDJSON ou CSV).
+
+Antes só dava pra tirar dados reunião por reunião (API) ou catando os
+meetings/*.json e logs/*.jsonl. Aqui o banco sai inteiro (ou um workspace, uma
+reunião, um intervalo de datas) em streaming:
+
+- db.stream_meetings / db.stream_messages leem com yield_per (cursor do lado
+  do servidor), em lotes de ORLEM_EXPORT_BATCH linhas
+- cada lote vira um pedaço de NDJSON/CSV e, com gzip, é comprimido na hora
+- a memória fica no tamanho de um lote, com mil ou com milhões de mensagens
+
+Usado pelo GET /api/export e pela linha de comando:
+
+    python export.py --type messages --format ndjson > mensagens.ndjson
+    python export.py --type messages --format csv --gzip -o mensagens.csv.gz
+    python export.py --type meetings --workspace 1 --since 2024-01-01 --until 2024-07-01
+
+Variáveis de ambiente:
+- ORLEM_EXPORT_BATCH  (padrão 1000)  linhas por lote (yield_per)
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from db import EXPORT_MEETING_FIELDS, EXPORT_MESSAGE_FIELDS, stream_meetings, stream_messages
+
+EXPORT_BATCH = int(os.getenv("ORLEM_EXPORT_BATCH", "1000"))
+
+TYPES = {
+    "meetings": (stream_meetings, EXPORT_MEETING_FIELDS),
+    "messages": (stream_messages, EXPORT_MESSAGE_FIELDS),
+}
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _ndjson(batches: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for rows in batches:
+        if rows:
+            yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows).encode("utf-8")
+
+
+def _csv(batches: Iterable[List[Dict[str, Any]]], fields) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for rows in batches:
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime em streaming (formato .gz), pedaço a pedaço."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = cabeçalho gzip
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def export_chunks(
+    type: str = "messages",
+    format: str = "ndjson",
+    gzip: bool = False,
+    workspace_id: Optional[int] = None,
+    meeting_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch: int = EXPORT_BATCH,
+) -> Iterator[bytes]:
+    """
+    Gerador síncrono dos bytes da exportação (um pedaço por lote do banco).
+    Levanta ValueError com type/format desconhecido.
+    """
+    if type not in TYPES:
+        raise ValueError(f"type desconhecido: {type!r} (use {' | '.join(TYPES)})")
+    if format not in FORMATS:
+        raise ValueError(f"format desconhecido: {format!r} (use {' | '.join(FORMATS)})")
+    stream, fields = TYPES[type]
+    batches = stream(workspace_id=workspace_id, meeting_id=meeting_id, since=since, until=until, batch=batch)
+    chunks = _ndjson(batches) if format == "ndjson" else _csv(batches, fields)
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def filename(type: str, format: str, gzip: bool = False) -> str:
+    name = f"orlem-{type}-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return name + ".gz" if gzip else name
+
+
+def _parse_date(value: Optional[str], end: bool = False) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    # só a data no --until vale o dia inteiro
+    return parsed + timedelta(days=1) if end and len(value) == 10 else parsed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Exporta reuniões/mensagens do Orlem em NDJSON ou CSV.")
+    ap.add_argument("--type", choices=list(TYPES), default="messages")
+    ap.add_argument("--format", choices=list(FORMATS), default="ndjson")
+    ap.add_argument("--gzip", action="store_true", help="comprime a saída (.gz)")
+    ap.add_argument("--workspace", type=int, default=None, help="só esse workspace")
+    ap.add_argument("--meeting", type=int, default=None, help="só essa reunião")
+    ap.add_argument("--since", default=None, help="a partir de (ISO, ex.: 2024-01-01)")
+    ap.add_argument("--until", default=None, help="até (ISO; só a data inclui o dia)")
+    ap.add_argument("--batch", type=int, default=EXPORT_BATCH, help="linhas por lote do banco")
+    ap.add_argument("-o", "--output", default="-", help="arquivo de saída (padrão: stdout)")
+    args = ap.parse_args(argv)
+
+    try:
+        since, until = _parse_date(args.since), _parse_date(args.until, end=True)
+    except ValueError as e:
+        ap.error(f"data inválida: {e}")
+
+    chunks = export_chunks(
+        type=args.type,
+        format=args.format,
+        gzip=args.gzip,
+        workspace_id=args.workspace,
+        meeting_id=args.meeting,
+        since=since,
+        until=until,
+        batch=args.batch,
+    )
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    total = 0
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+            total += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    if args.output != "-":
+        print(f"{total} bytes em {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
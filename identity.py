@@ -0,0 +1,59 @@
+"""
+ORLEM — identidade do app (usuário + workspace) resolvida uma vez só.
+
+Cada GET /api/meetings e cada conexão do WebSocket chamava
+get_or_create_default_user (sessão + SELECT no banco) só pra descobrir um id
+que nunca muda, e create_meeting usava workspace_id=1 sem ninguém garantir que
+o workspace existia.
+
+Agora a IdentityService resolve tudo na subida do app (ensure_default_identity
+cria usuário, workspace e vínculo se faltarem) e guarda em memória; no caminho
+de cada pedido é só ler um atributo. Quem troca usuário/workspace no banco
+(script, admin) chama invalidate() e a próxima leitura resolve de novo.
+"""
+
+from collections import Counter
+from typing import Any, Dict, NamedTuple, Optional
+
+from db_async import ensure_default_identity
+
+
+class Identity(NamedTuple):
+    user_id: int
+    workspace_id: int
+
+
+class IdentityService:
+    """Cache em memória da identidade padrão (modo single-workspace)."""
+
+    def __init__(self):
+        self._current: Optional[Identity] = None
+        # "hits", "loads", "invalidations"
+        self.counters: Counter = Counter()
+
+    async def get(self) -> Identity:
+        """Identidade em cache; só vai ao banco na 1ª vez ou depois de invalidate()."""
+        current = self._current
+        if current is not None:
+            self.counters["hits"] += 1
+            return current
+        self.counters["loads"] += 1
+        current = Identity(*await ensure_default_identity())
+        self._current = current
+        return current
+
+    def invalidate(self) -> None:
+        self.counters["invalidations"] += 1
+        self._current = None
+
+    def stats(self) -> Dict[str, Any]:
+        current = self._current
+        return {
+            "user_id": current.user_id if current else None,
+            "workspace_id": current.workspace_id if current else None,
+            **dict(self.counters),
+        }
+
+
+# identidade única do processo (usada pelo app)
+identity = IdentityService()
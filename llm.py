@@ -0,0 +1,365 @@
+"""
+ORLEM — motor LLM assíncrono.
+
+- Um único AsyncOpenAI por processo, com pool HTTP compartilhado e ajustável
+- Limite de chamadas simultâneas por processo (semáforo)
+- Nada aqui bloqueia o event loop do uvicorn
+- Quem atende de fato (API, gravação, replay, fake) é o backend: ver backends.py
+
+Variáveis de ambiente:
+- ORLEM_HTTP_MAX_CONNECTIONS   (padrão 20)  conexões abertas no pool
+- ORLEM_HTTP_MAX_KEEPALIVE     (padrão 10)  conexões ociosas mantidas vivas
+- ORLEM_HTTP_KEEPALIVE_EXPIRY  (padrão 30)  segundos até fechar conexão ociosa
+- ORLEM_LLM_CONCURRENCY        (padrão 8)   chamadas LLM simultâneas por processo
+- ORLEM_LLM_RPM                (padrão 0)   teto de chamadas por minuto (0 = sem teto)
+- ORLEM_BACKEND                (padrão openai)  openai | record | replay | fake
+
+Quando a API devolve 429, todas as chamadas do processo esperam o Retry-After
+antes de sair de novo (em vez de cada uma bater no limite por conta própria).
+
+Toda chamada passa pelo resilience.py (prazo, retry com jitter, hedge opcional
+e circuit breaker por operação: chat, embed, stt, tts). Esgotado, sobe
+UpstreamUnavailable e quem chamou cai no fallback local.
+- ORLEM_CHAT_TIMEOUT_S         (padrão 60)  prazo de um chat sem stream
+- ORLEM_FIRST_TOKEN_TIMEOUT_S  (padrão 15)  prazo até o 1º pedaço do stream
+- ORLEM_STREAM_IDLE_TIMEOUT_S  (padrão 20)  silêncio máximo entre pedaços
+- ORLEM_EMBED_TIMEOUT_S        (padrão 10)
+- ORLEM_STT_TIMEOUT_S          (padrão 30)
+- ORLEM_TTS_TIMEOUT_S          (padrão 20)
+
+Embeddings (memória da reunião, ver retrieval.py):
+- ORLEM_EMBED_MODEL            (padrão text-embedding-3-small)
+- ORLEM_EMBED_DIM              (padrão 256)  dimensão pedida ao modelo
+"""
+
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError
+
+import resilience
+from backends import Backend, BACKEND, make_backend
+from resilience import CircuitBreaker, UpstreamUnavailable
+
+# ---------------------------------------------------------
+# 0. Setup
+# ---------------------------------------------------------
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o-mini")
+STT_MODEL = os.getenv("ORLEM_STT_MODEL", "gpt-4o-mini-transcribe")
+TTS_MODEL = os.getenv("ORLEM_TTS_MODEL", "gpt-4o-mini-tts")
+TTS_VOICE = os.getenv("ORLEM_TTS_VOICE", "coral")
+EMBED_MODEL = os.getenv("ORLEM_EMBED_MODEL", "text-embedding-3-small")
+EMBED_DIM = int(os.getenv("ORLEM_EMBED_DIM", "256"))
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("ORLEM_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("ORLEM_HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("ORLEM_HTTP_KEEPALIVE_EXPIRY", "30"))
+LLM_CONCURRENCY = int(os.getenv("ORLEM_LLM_CONCURRENCY", "8"))
+LLM_RPM = float(os.getenv("ORLEM_LLM_RPM", "0"))
+
+CHAT_TIMEOUT_S = float(os.getenv("ORLEM_CHAT_TIMEOUT_S", "60"))
+FIRST_TOKEN_TIMEOUT_S = float(os.getenv("ORLEM_FIRST_TOKEN_TIMEOUT_S", "15"))
+STREAM_IDLE_TIMEOUT_S = float(os.getenv("ORLEM_STREAM_IDLE_TIMEOUT_S", "20"))
+EMBED_TIMEOUT_S = float(os.getenv("ORLEM_EMBED_TIMEOUT_S", "10"))
+STT_TIMEOUT_S = float(os.getenv("ORLEM_STT_TIMEOUT_S", "30"))
+TTS_TIMEOUT_S = float(os.getenv("ORLEM_TTS_TIMEOUT_S", "20"))
+
+# pausa padrão quando o 429 não traz Retry-After
+RATE_LIMIT_DEFAULT_PAUSE = 5.0
+
+# um circuito por operação externa
+BREAKERS: Dict[str, CircuitBreaker] = {
+    "chat": CircuitBreaker("chat"),
+    "embed": CircuitBreaker("embed"),
+    "stt": CircuitBreaker("stt"),
+    "tts": CircuitBreaker("tts"),
+}
+
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+_backend: Optional[Backend] = None
+
+# "calls", "rate_limited", "waited_s"
+RATE_STATS: Counter = Counter()
+
+
+# ---------------------------------------------------------
+# 1. Cliente e pool
+# ---------------------------------------------------------
+def get_client() -> AsyncOpenAI:
+    """Cliente assíncrono único do processo (criado na primeira chamada)."""
+    global _client
+    if _client is None:
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
+    return _client
+
+
+def get_backend() -> Backend:
+    """Backend do processo (ORLEM_BACKEND), criado na primeira chamada."""
+    global _backend
+    if _backend is None:
+        _backend = make_backend(BACKEND, get_client)
+    return _backend
+
+
+def set_backend(backend: Optional[Backend]) -> None:
+    """Troca o backend (benchmarks/ferramentas). None volta pro ORLEM_BACKEND."""
+    global _backend
+    _backend = backend
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+    return _semaphore
+
+
+class RateLimiter:
+    """
+    Espaça as chamadas para não passar de `rpm` por minuto e segura todo mundo
+    durante uma pausa de 429. rpm=0 só aplica as pausas.
+    """
+
+    def __init__(self, rpm: float = 0.0):
+        self.set_rpm(rpm)
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+
+    def set_rpm(self, rpm: float) -> None:
+        self.rpm = max(0.0, rpm)
+        self._interval = 60.0 / self.rpm if self.rpm else 0.0
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        # reserva a vaga sem await (sem corrida no event loop) e só depois dorme
+        now = time.monotonic()
+        start = max(now, self._next_slot, self._paused_until)
+        self._next_slot = start + self._interval
+        wait = start - now
+        if wait > 0:
+            RATE_STATS["waited_s"] += wait
+            await asyncio.sleep(wait)
+        # a pausa pode ter sido estendida enquanto esperávamos
+        while self._paused_until > time.monotonic():
+            await asyncio.sleep(self._paused_until - time.monotonic())
+
+
+rate_limiter = RateLimiter(LLM_RPM)
+
+
+def set_rate_limit(rpm: float) -> None:
+    """Muda o teto de chamadas por minuto do processo (0 = sem teto)."""
+    rate_limiter.set_rpm(rpm)
+
+
+def _retry_after(err: RateLimitError) -> float:
+    try:
+        value = err.response.headers.get("retry-after")
+        return float(value) if value else RATE_LIMIT_DEFAULT_PAUSE
+    except (AttributeError, TypeError, ValueError):
+        return RATE_LIMIT_DEFAULT_PAUSE
+
+
+def _on_rate_limited(err: RateLimitError) -> None:
+    RATE_STATS["rate_limited"] += 1
+    rate_limiter.pause(_retry_after(err))
+
+
+def resilience_stats() -> Dict[str, Any]:
+    """Estado dos circuitos + contadores de retry/hedge/timeout."""
+    return {
+        "breakers": {name: b.describe() for name, b in BREAKERS.items()},
+        **dict(resilience.RESILIENCE_STATS),
+    }
+
+
+async def aclose() -> None:
+    """Fecha o pool HTTP (chamado no shutdown do app)."""
+    global _client
+    if _backend is not None:
+        await _backend.aclose()
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+# ---------------------------------------------------------
+# 2. Chamadas
+# ---------------------------------------------------------
+async def _chat_once(messages: List[Dict[str, Any]], model: str, kwargs: Dict[str, Any]) -> str:
+    async with _get_semaphore():
+        await rate_limiter.acquire()
+        RATE_STATS["calls"] += 1
+        try:
+            return await get_backend().chat(model, messages, **kwargs)
+        except RateLimitError as e:
+            _on_rate_limited(e)
+            raise
+
+
+async def chat(
+    messages: List[Dict[str, Any]],
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+    hedge_after: Optional[float] = None,
+    **kwargs: Any,
+) -> str:
+    """
+    Chat completion sem bloquear o event loop.
+    kwargs extras (temperature, max_tokens...) vão direto pra API.
+    Sem resposta no prazo (com retries) ou circuito aberto: UpstreamUnavailable.
+    """
+    model = model or MODEL_NAME
+    return await resilience.call(
+        "chat",
+        lambda: _chat_once(messages, model, kwargs),
+        BREAKERS["chat"],
+        timeout or CHAT_TIMEOUT_S,
+        hedge_after=hedge_after,
+    )
+
+
+async def _stream_once(messages: List[Dict[str, Any]], model: str, kwargs: Dict[str, Any]) -> AsyncIterator[str]:
+    # a vaga no semáforo fica presa até o stream terminar (ou ser fechado)
+    async with _get_semaphore():
+        await rate_limiter.acquire()
+        RATE_STATS["calls"] += 1
+        stream = get_backend().chat_stream(model, messages, **kwargs)
+        try:
+            async for delta in stream:
+                yield delta
+        except RateLimitError as e:
+            _on_rate_limited(e)
+            raise
+        finally:
+            await stream.aclose()
+
+
+async def _start_stream(
+    messages: List[Dict[str, Any]], model: str, kwargs: Dict[str, Any]
+) -> Tuple[AsyncIterator[str], Optional[str]]:
+    """Abre um stream e espera o 1º pedaço (None = stream vazio)."""
+    gen = _stream_once(messages, model, kwargs)
+    try:
+        try:
+            first: Optional[str] = await gen.__anext__()
+        except StopAsyncIteration:
+            first = None
+        return gen, first
+    except BaseException:
+        await gen.aclose()
+        raise
+
+
+async def _discard_stream(started: Tuple[AsyncIterator[str], Optional[str]]) -> None:
+    await started[0].aclose()
+
+
+async def chat_stream(
+    messages: List[Dict[str, Any]],
+    model: Optional[str] = None,
+    first_token_timeout: Optional[float] = None,
+    hedge_after: Optional[float] = None,
+    **kwargs: Any,
+) -> AsyncIterator[str]:
+    """
+    Mesmo que chat(), mas devolve os pedaços de texto conforme o modelo gera.
+    Retry/hedge só até o 1º pedaço; depois disso, stream parado por mais de
+    STREAM_IDLE_TIMEOUT_S vira UpstreamUnavailable.
+    """
+    model = model or MODEL_NAME
+    gen, first = await resilience.call(
+        "chat",
+        lambda: _start_stream(messages, model, kwargs),
+        BREAKERS["chat"],
+        first_token_timeout or FIRST_TOKEN_TIMEOUT_S,
+        hedge_after=hedge_after,
+        discard=_discard_stream,
+    )
+    try:
+        if first is None:
+            return
+        yield first
+        while True:
+            try:
+                delta = await asyncio.wait_for(gen.__anext__(), STREAM_IDLE_TIMEOUT_S)
+            except StopAsyncIteration:
+                return
+            except resilience.TRANSIENT_ERRORS as e:
+                BREAKERS["chat"].record_failure()
+                if isinstance(e, asyncio.TimeoutError):
+                    resilience.RESILIENCE_STATS["chat:stream_stalls"] += 1
+                raise UpstreamUnavailable("chat", "stream interrompido", e) from e
+            yield delta
+    finally:
+        await gen.aclose()
+
+
+async def _embed_once(texts: List[str], model: str, dimensions: int) -> List[List[float]]:
+    async with _get_semaphore():
+        await rate_limiter.acquire()
+        RATE_STATS["calls"] += 1
+        try:
+            return await get_backend().embed(model, texts, dimensions)
+        except RateLimitError as e:
+            _on_rate_limited(e)
+            raise
+
+
+async def embed(
+    texts: List[str],
+    model: Optional[str] = None,
+    dimensions: Optional[int] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+) -> List[List[float]]:
+    """Textos -> vetores (um por texto, na mesma ordem)."""
+    model = model or EMBED_MODEL
+    dimensions = dimensions or EMBED_DIM
+    return await resilience.call(
+        "embed",
+        lambda: _embed_once(texts, model, dimensions),
+        BREAKERS["embed"],
+        timeout or EMBED_TIMEOUT_S,
+        retries=resilience.RETRIES if retries is None else retries,
+    )
+
+
+async def transcribe(audio: bytes, filename: str = "audio.webm", model: Optional[str] = None) -> str:
+    """Áudio -> texto (STT)."""
+    model = model or STT_MODEL
+    return await resilience.call(
+        "stt",
+        lambda: get_backend().transcribe(model, audio, filename),
+        BREAKERS["stt"],
+        STT_TIMEOUT_S,
+    )
+
+
+async def speech(text: str, voice: Optional[str] = None, model: Optional[str] = None) -> bytes:
+    """Texto -> áudio MP3 (TTS)."""
+    model = model or TTS_MODEL
+    voice = voice or TTS_VOICE
+    return await resilience.call(
+        "tts",
+        lambda: get_backend().speech(model, voice, text),
+        BREAKERS["tts"],
+        TTS_TIMEOUT_S,
+    )
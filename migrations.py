@@ -0,0 +1,163 @@
+"""
+ORLEM — migrações versionadas do banco.
+
+init_db() faz create_all: num banco novo cria o esquema atual inteiro, mas numa
+tabela que já existe não mexe (índice novo, coluna nova ficam de fora). Toda
+mudança de esquema entra aqui também, como uma migração numerada:
+
+    @migration(2, "coluna x em meetings")
+    def _add_meeting_x(conn):
+        conn.execute(text("ALTER TABLE meetings ADD COLUMN x TEXT"))
+
+- roda em ordem de versão, cada uma uma vez por banco, numa transação própria,
+  e fica registrada em schema_migrations (versão, nome, quando)
+- init_db() chama upgrade() depois do create_all; num banco novo as migrações
+  só são registradas (escreva com IF NOT EXISTS: o create_all já fez o trabalho)
+- dois workers subindo juntos: quem chega depois acha a versão gravada e segue
+
+Uso:
+    python migrations.py             # aplica as pendentes no orlem.db
+    python migrations.py --status    # aplicadas e pendentes
+"""
+
+import argparse
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from db import engine
+from models import SchemaMigration
+
+Migration = Tuple[int, str, Callable[[Connection], None]]
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str) -> Callable[[Callable[[Connection], None]], Callable[[Connection], None]]:
+    """Registra fn(conn) como a migração `version`."""
+
+    def register(fn: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if any(v == version for v, _, _ in MIGRATIONS):
+            raise ValueError(f"migração {version} duplicada")
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+
+    return register
+
+
+# ================================
+# MIGRAÇÕES
+# ================================
+@migration(1, "índices das consultas de reuniões e mensagens")
+def _hot_query_indexes(conn: Connection) -> None:
+    # mesmos índices declarados em models.py (__table_args__)
+    for ddl in (
+        # get_meeting_messages: WHERE meeting_id = ? ORDER BY created_at
+        "CREATE INDEX IF NOT EXISTS ix_messages_meeting_created ON messages (meeting_id, created_at)",
+        # list_meetings / get_last_meeting: ORDER BY created_at DESC
+        "CREATE INDEX IF NOT EXISTS ix_meetings_created_at ON meetings (created_at)",
+        # list_meeting_ids (reprocess --status): WHERE status = ? ORDER BY id
+        "CREATE INDEX IF NOT EXISTS ix_meetings_status_id ON meetings (status, id)",
+        # purge_expired do cache e das sessões: WHERE <data> < ?
+        "CREATE INDEX IF NOT EXISTS ix_llm_cache_created_at ON llm_cache (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_session_states_last_activity ON session_states (last_activity)",
+    ):
+        conn.execute(text(ddl))
+
+
+@migration(2, "mensagens da reunião por (meeting_id, id) para paginação por keyset")
+def _messages_keyset_index(conn: Connection) -> None:
+    # get_meeting_messages passou a ordenar por id (before_id/since_id)
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_messages_meeting_id ON messages (meeting_id, id)"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_messages_meeting_created"))
+
+
+@migration(3, "busca textual no PostgreSQL (índices GIN de tsvector)")
+def _pg_text_search(conn: Connection) -> None:
+    # SQLite usa as tabelas FTS5 (db._ensure_fts); a config e as expressões
+    # têm que ser as mesmas de db._text_match
+    if conn.dialect.name != "postgresql":
+        return
+    exists = conn.execute(text("SELECT 1 FROM pg_ts_config WHERE cfgname = 'orlem_search'")).first()
+    if not exists:
+        conn.execute(text("CREATE TEXT SEARCH CONFIGURATION orlem_search (COPY = simple)"))
+        # "decisao" acha "decisão", como o remove_diacritics do FTS5
+        try:
+            with conn.begin_nested():
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+            conn.execute(text(
+                "ALTER TEXT SEARCH CONFIGURATION orlem_search "
+                "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple"
+            ))
+        except DBAPIError as e:
+            print("[migrations] extensão unaccent indisponível; a busca vai diferenciar acentos:", e.orig)
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_messages_content_tsv ON messages "
+        "USING GIN (to_tsvector('orlem_search'::regconfig, content))"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_meetings_title_tsv ON meetings "
+        "USING GIN (to_tsvector('orlem_search'::regconfig, title))"
+    ))
+
+
+# ================================
+# EXECUÇÃO
+# ================================
+def applied_versions() -> Dict[int, str]:
+    """{versão: nome} das migrações já aplicadas."""
+    SchemaMigration.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return dict(conn.execute(select(SchemaMigration.version, SchemaMigration.name)).all())
+
+
+def pending() -> List[Migration]:
+    done = applied_versions()
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def upgrade() -> List[int]:
+    """Aplica as migrações pendentes, em ordem. Retorna as versões aplicadas."""
+    applied: List[int] = []
+    for version, name, fn in pending():
+        try:
+            with engine.begin() as conn:
+                already = conn.execute(
+                    select(SchemaMigration.version).where(SchemaMigration.version == version)
+                ).first()
+                if already:
+                    continue
+                fn(conn)
+                conn.execute(SchemaMigration.__table__.insert().values(version=version, name=name))
+        except IntegrityError:
+            # outro processo aplicou a mesma versão ao mesmo tempo
+            continue
+        print(f"[migrations] {version}: {name}")
+        applied.append(version)
+    return applied
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Aplica as migrações do banco do Orlem.")
+    ap.add_argument("--status", action="store_true", help="só lista aplicadas e pendentes")
+    args = ap.parse_args(argv)
+
+    if args.status:
+        done = applied_versions()
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:>4}  {'aplicada' if version in done else 'pendente':<9} {name}")
+        return 0
+
+    from db import init_db
+
+    init_db()  # create_all + upgrade()
+    print(f"banco na versão {max(applied_versions(), default=0)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
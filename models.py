@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Text, Integer, ForeignKey, DateTime
+from sqlalchemy import String, Text, Integer, ForeignKey, DateTime, UniqueConstraint, Index
 
 
 class Base(DeclarativeBase):
@@ -40,6 +40,11 @@ class Member(Base):
 
 class Meeting(Base):
     __tablename__ = "meetings"
+    # índices também criados em bancos antigos pela migração 1 (migrations.py)
+    __table_args__ = (
+        Index("ix_meetings_created_at", "created_at"),
+        Index("ix_meetings_status_id", "status", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     workspace_id: Mapped[int] = mapped_column(ForeignKey("workspaces.id"))
@@ -52,10 +57,78 @@ class Meeting(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    # id cresce na ordem das falas: lista e pagina a reunião por (meeting_id, id)
+    __table_args__ = (Index("ix_messages_meeting_id", "meeting_id", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     meeting_id: Mapped[int] = mapped_column(ForeignKey("meetings.id"))
     role: Mapped[str] = mapped_column(String(20))  # user|orlem|system
     content: Mapped[str] = mapped_column(Text)
     meta_json: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class LLMCache(Base):
+    __tablename__ = "llm_cache"
+    __table_args__ = (Index("ix_llm_cache_created_at", "created_at"),)
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 (system, contexto, modelo)
+    model: Mapped[str] = mapped_column(String(80))
+    response: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class MeetingSummary(Base):
+    """Resumo incremental da reunião + checkpoint (última mensagem já incorporada)."""
+    __tablename__ = "meeting_summaries"
+
+    meeting_id: Mapped[int] = mapped_column(ForeignKey("meetings.id"), primary_key=True)
+    summary: Mapped[str] = mapped_column(Text)
+    last_message_id: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class MeetingArtifact(Base):
+    """Artefatos finais da reunião (resumo, decisões, ações, diarização), um por tipo."""
+    __tablename__ = "meeting_artifacts"
+    __table_args__ = (UniqueConstraint("meeting_id", "kind", name="uq_meeting_artifact_kind"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    meeting_id: Mapped[int] = mapped_column(ForeignKey("meetings.id"))
+    kind: Mapped[str] = mapped_column(String(20))  # summary|decisions|actions|diarization
+    content: Mapped[str] = mapped_column(Text)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ReprocessItem(Base):
+    """Checkpoint do reprocessamento em lote: uma linha por (rodada, reunião)."""
+    __tablename__ = "reprocess_items"
+
+    run: Mapped[str] = mapped_column(String(80), primary_key=True)
+    meeting_id: Mapped[int] = mapped_column(ForeignKey("meetings.id"), primary_key=True)
+    status: Mapped[str] = mapped_column(String(20))  # done|failed|skipped
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    duration_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class SessionState(Base):
+    """Estado da sessão (aba/conexão do front), compartilhado entre workers."""
+    __tablename__ = "session_states"
+    __table_args__ = (Index("ix_session_states_last_activity", "last_activity"),)
+
+    session_id: Mapped[str] = mapped_column(String(120), primary_key=True)
+    meeting_id: Mapped[Optional[int]] = mapped_column(ForeignKey("meetings.id"), nullable=True)
+    tone: Mapped[str] = mapped_column(String(20), default="auto")  # auto|interno|cliente|neutro
+    last_activity: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class SchemaMigration(Base):
+    """Migrações já aplicadas neste banco (ver migrations.py)."""
+    __tablename__ = "schema_migrations"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(200))
+    applied_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
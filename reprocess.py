@@ -0,0 +1,258 @@
+"""
+ORLEM — reprocessamento em lote das reuniões salvas.
+
+Depois de mudar um prompt no brain.py, regera os artefatos (resumo, decisões,
+ações, diarização) de todas as reuniões do banco, sem passar pela API:
+
+- N reuniões em paralelo (--concurrency), com o semáforo do llm por baixo
+- teto de chamadas por minuto (--rpm) e pausa global quando a API devolve 429;
+  a reunião que levou 429 volta pra fila com backoff (--retries)
+- checkpoint por reunião na tabela reprocess_items: rodar de novo com o mesmo
+  --run continua de onde parou (Ctrl+C não perde o que já foi gravado)
+- progresso e vazão (reuniões/min, tokens/s) a cada --progress-every segundos
+
+Uso:
+    python reprocess.py --run prompts-v2
+    python reprocess.py --run prompts-v2 --concurrency 8 --rpm 300
+    python reprocess.py --run so-resumo --artifacts summary --status closed
+    python reprocess.py --run prompts-v2 --restart        # ignora o checkpoint
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from openai import APIConnectionError, APITimeoutError, RateLimitError
+
+import brain
+import db_async
+import llm
+from brain import summarize_transcript, extract_decisions, extract_actions, diarize_transcript
+# banco pelas threads do db_async: uma reunião lendo/gravando não trava as outras
+from db_async import (
+    init_db,
+    list_meeting_ids,
+    get_meeting_messages,
+    finalize_meeting,
+    get_reprocess_state,
+    save_reprocess_item,
+    reset_reprocess_run,
+)
+from resilience import UpstreamUnavailable
+from transcript import build_transcript
+
+# artefato -> gerador (mesmos do encerramento da reunião)
+GENERATORS = {
+    "summary": summarize_transcript,
+    "decisions": extract_decisions,
+    "actions": extract_actions,
+    "diarization": diarize_transcript,
+}
+
+# erros que valem nova tentativa (o resto marca a reunião como failed direto)
+TRANSIENT_ERRORS = (UpstreamUnavailable, RateLimitError, APITimeoutError, APIConnectionError)
+
+
+class Progress:
+    """Contadores da rodada + linha de progresso."""
+
+    def __init__(self, run: str, total: int):
+        self.run = run
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.retries = 0
+        self.tokens = 0
+        self.started = time.monotonic()
+
+    @property
+    def finished(self) -> int:
+        return self.done + self.failed + self.skipped
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = self.finished / elapsed
+        pct = 100.0 * self.finished / self.total if self.total else 100.0
+        eta = (self.total - self.finished) / rate if rate else 0.0
+        return (
+            f"[{self.run}] {self.finished}/{self.total} ({pct:.1f}%) "
+            f"ok={self.done} falhou={self.failed} vazia={self.skipped} retries={self.retries} "
+            f"| {rate * 60:.1f} reuniões/min, {self.tokens / elapsed:.0f} tokens/s "
+            f"| 429={llm.RATE_STATS['rate_limited']} "
+            f"| {elapsed:.0f}s, ETA {eta:.0f}s"
+        )
+
+
+async def process_meeting(meeting_id: int, kinds: List[str], progress: Progress) -> str:
+    """Regera os artefatos de uma reunião e grava numa transação. Retorna o status."""
+    msgs = await get_meeting_messages(meeting_id)
+    built = build_transcript(msgs)
+    transcript = built["text"]
+    if not transcript.strip():
+        return "skipped"
+
+    results = await asyncio.gather(*(GENERATORS[k](transcript) for k in kinds))
+    artifacts = dict(zip(kinds, results))
+
+    # resumo do zero: o checkpoint incremental passa a valer a partir dele
+    checkpoint = built["last_message_id"] if "summary" in artifacts else None
+    await finalize_meeting(meeting_id, artifacts=artifacts, summary_checkpoint=checkpoint, status=None)
+    progress.tokens += built["tokens"]
+    return "done"
+
+
+async def worker(
+    queue: "asyncio.Queue[tuple]",
+    run: str,
+    kinds: List[str],
+    retries: int,
+    progress: Progress,
+) -> None:
+    while True:
+        meeting_id, attempt = await queue.get()
+        t0 = time.monotonic()
+        try:
+            status = await process_meeting(meeting_id, kinds, progress)
+            error = None
+        except TRANSIENT_ERRORS as e:
+            if attempt < retries:
+                # backoff exponencial com jitter; o 429 já pausou o llm inteiro
+                delay = min(60.0, 2.0 ** attempt) * (0.5 + random.random())
+                progress.retries += 1
+                queue.task_done()
+                asyncio.get_running_loop().call_later(
+                    delay, queue.put_nowait, (meeting_id, attempt + 1)
+                )
+                continue
+            status, error = "failed", f"{type(e).__name__}: {e}"
+        except Exception as e:
+            status, error = "failed", f"{type(e).__name__}: {e}"
+
+        duration_ms = int((time.monotonic() - t0) * 1000)
+        await save_reprocess_item(run, meeting_id, status, attempts=attempt + 1, error=error, duration_ms=duration_ms)
+        if status == "done":
+            progress.done += 1
+        elif status == "skipped":
+            progress.skipped += 1
+        else:
+            progress.failed += 1
+            print(f"  reunião {meeting_id} falhou: {error}", file=sys.stderr)
+        queue.task_done()
+
+
+async def report(progress: Progress, every: float) -> None:
+    while True:
+        await asyncio.sleep(every)
+        print(progress.line(), flush=True)
+
+
+async def reprocess(
+    run: str,
+    kinds: List[str],
+    concurrency: int = 4,
+    retries: int = 3,
+    status: Optional[str] = None,
+    meeting_ids: Optional[List[int]] = None,
+    limit: Optional[int] = None,
+    restart: bool = False,
+    retry_failed: bool = True,
+    progress_every: float = 10.0,
+) -> Progress:
+    await init_db()
+    if restart:
+        print(f"checkpoint da rodada '{run}' apagado ({await reset_reprocess_run(run)} itens)")
+
+    state: Dict[int, str] = await get_reprocess_state(run)
+    finished = {"done", "skipped"} if retry_failed else {"done", "skipped", "failed"}
+    todo = [mid for mid in await list_meeting_ids(status=status, meeting_ids=meeting_ids) if state.get(mid) not in finished]
+    if limit is not None:
+        todo = todo[:limit]
+
+    already = sum(1 for st in state.values() if st in finished)
+    print(f"[{run}] {len(todo)} reuniões a processar ({already} já feitas nesta rodada), artefatos: {', '.join(kinds)}")
+
+    progress = Progress(run, len(todo))
+    if not todo:
+        return progress
+
+    queue: "asyncio.Queue[tuple]" = asyncio.Queue()
+    for mid in todo:
+        queue.put_nowait((mid, 0))
+
+    workers = [
+        asyncio.create_task(worker(queue, run, kinds, retries, progress))
+        for _ in range(max(1, concurrency))
+    ]
+    reporter = asyncio.create_task(report(progress, progress_every))
+    try:
+        # a fila pode esvaziar com retries agendados: espera até todos terminarem
+        while progress.finished < progress.total:
+            await queue.join()
+            if progress.finished < progress.total:
+                await asyncio.sleep(0.2)
+    finally:
+        reporter.cancel()
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(reporter, *workers, return_exceptions=True)
+        await llm.aclose()
+        db_async.shutdown()
+
+    print(progress.line())
+    return progress
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Reprocessa os artefatos das reuniões salvas.")
+    ap.add_argument("--run", default="reprocess", help="nome da rodada (chave do checkpoint)")
+    ap.add_argument(
+        "--artifacts",
+        default=",".join(GENERATORS),
+        help=f"artefatos a regerar, separados por vírgula ({', '.join(GENERATORS)})",
+    )
+    ap.add_argument("--concurrency", type=int, default=4, help="reuniões em paralelo")
+    ap.add_argument("--rpm", type=float, default=llm.LLM_RPM, help="chamadas LLM por minuto (0 = sem teto)")
+    ap.add_argument("--retries", type=int, default=3, help="novas tentativas em 429/timeout")
+    ap.add_argument("--status", default=None, help="só reuniões com esse status (open|closed|archived)")
+    ap.add_argument("--meeting", type=int, action="append", dest="meeting_ids", help="só essa reunião (pode repetir)")
+    ap.add_argument("--limit", type=int, default=None, help="processa no máximo N reuniões")
+    ap.add_argument("--restart", action="store_true", help="apaga o checkpoint da rodada antes")
+    ap.add_argument("--skip-failed", action="store_true", help="não tenta de novo as que falharam antes")
+    ap.add_argument("--progress-every", type=float, default=10.0, help="segundos entre linhas de progresso")
+    args = ap.parse_args(argv)
+
+    kinds = [k.strip() for k in args.artifacts.split(",") if k.strip()]
+    unknown = [k for k in kinds if k not in GENERATORS]
+    if unknown or not kinds:
+        ap.error(f"artefato desconhecido: {', '.join(unknown) or '(nenhum)'}")
+
+    llm.set_rate_limit(args.rpm)
+    # modelo fora do ar = reunião volta pra fila, não texto local gravado no banco
+    brain.LOCAL_FALLBACKS = False
+    try:
+        progress = asyncio.run(
+            reprocess(
+                run=args.run,
+                kinds=kinds,
+                concurrency=args.concurrency,
+                retries=args.retries,
+                status=args.status,
+                meeting_ids=args.meeting_ids,
+                limit=args.limit,
+                restart=args.restart,
+                retry_failed=not args.skip_failed,
+                progress_every=args.progress_every,
+            )
+        )
+    except KeyboardInterrupt:
+        print(f"\ninterrompido: rode de novo com --run {args.run} para continuar")
+        return 130
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
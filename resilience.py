@@ -0,0 +1,210 @@
+"""
+ORLEM — resiliência das chamadas externas (chat, STT, TTS).
+
+- prazo por chamada: nenhuma chamada segura um turno do WebSocket pra sempre
+- novas tentativas limitadas, com backoff exponencial e jitter ("full jitter")
+- hedge opcional (respostas ao vivo): se a 1ª tentativa não respondeu depois de
+  hedge_after segundos, dispara uma 2ª em paralelo e fica com a que chegar antes
+- circuit breaker por operação: depois de N falhas seguidas abre e falha na hora
+  (o chamador cai no fallback local); depois de reset_timeout deixa passar uma
+  chamada de teste (half-open) e fecha de novo se ela der certo
+
+Só erros "de infraestrutura" contam (timeout, conexão, 429, 5xx). Erro do pedido
+(400, chave inválida...) sobe direto, sem retry e sem abrir o circuito.
+
+Variáveis de ambiente:
+- ORLEM_RETRIES              (padrão 2)    novas tentativas por chamada
+- ORLEM_RETRY_BASE_S         (padrão 0.5)  base do backoff
+- ORLEM_RETRY_MAX_S          (padrão 8)    teto de cada espera
+- ORLEM_BREAKER_FAILURES     (padrão 5)    falhas seguidas para abrir
+- ORLEM_BREAKER_RESET_S      (padrão 30)   segundos aberto antes do teste
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+RETRIES = int(os.getenv("ORLEM_RETRIES", "2"))
+RETRY_BASE_S = float(os.getenv("ORLEM_RETRY_BASE_S", "0.5"))
+RETRY_MAX_S = float(os.getenv("ORLEM_RETRY_MAX_S", "8"))
+BREAKER_FAILURES = int(os.getenv("ORLEM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_S = float(os.getenv("ORLEM_BREAKER_RESET_S", "30"))
+
+TRANSIENT_ERRORS = (
+    asyncio.TimeoutError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+
+# "<op>:retries", "<op>:hedges", "<op>:hedge_wins", "<op>:timeouts", "<op>:unavailable"
+RESILIENCE_STATS: Counter = Counter()
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailable(Exception):
+    """A operação não respondeu (prazo/tentativas esgotados ou circuito aberto)."""
+
+    def __init__(self, op: str, reason: str, cause: Optional[BaseException] = None):
+        super().__init__(f"{op}: {reason}" + (f" ({type(cause).__name__}: {cause})" if cause else ""))
+        self.op = op
+        self.reason = reason
+        self.cause = cause
+
+
+class CircuitBreaker:
+    """closed -> (N falhas) -> open -> (reset_timeout) -> half_open -> closed/open."""
+
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, reset_timeout_s: float = BREAKER_RESET_S):
+        self.name = name
+        self.failure_threshold = failures
+        self.reset_timeout_s = reset_timeout_s
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_inflight = False
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+            self._state = "half_open"
+            self._probe_inflight = False
+        return self._state
+
+    def allow(self) -> None:
+        """Levanta UpstreamUnavailable se a chamada não pode sair agora."""
+        st = self.state
+        if st == "open":
+            raise UpstreamUnavailable(self.name, "circuito aberto")
+        if st == "half_open":
+            if self._probe_inflight:
+                raise UpstreamUnavailable(self.name, "circuito em teste")
+            self._probe_inflight = True
+
+    def record_success(self) -> None:
+        self._state = "closed"
+        self._failures = 0
+        self._probe_inflight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == "half_open" or self._failures >= self.failure_threshold:
+            if self._state != "open":
+                self.opened_count += 1
+            self._state = "open"
+            self._opened_at = time.monotonic()
+            self._probe_inflight = False
+
+    def release(self) -> None:
+        """Chamada terminou sem sinal de saúde (ex.: erro do pedido)."""
+        self._probe_inflight = False
+
+    def describe(self) -> Dict[str, Any]:
+        st = self.state
+        out: Dict[str, Any] = {
+            "state": st,
+            "consecutive_failures": self._failures,
+            "opened_count": self.opened_count,
+        }
+        if st == "open":
+            out["retry_in_s"] = round(max(0.0, self.reset_timeout_s - (time.monotonic() - self._opened_at)), 1)
+        return out
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_S, cap: float = RETRY_MAX_S) -> float:
+    """Full jitter: uniforme em [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+async def _race_hedged(
+    op: str,
+    fn: Callable[[], Awaitable[T]],
+    timeout: float,
+    hedge_after: float,
+    discard: Optional[Callable[[T], Awaitable[None]]] = None,
+) -> T:
+    """
+    1ª tentativa; se demorar mais que hedge_after, uma 2ª em paralelo. Vence quem
+    chegar antes; a outra é cancelada (ou descartada com discard, se já terminou).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    tasks = [asyncio.ensure_future(fn())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=min(hedge_after, timeout))
+        if not done:
+            RESILIENCE_STATS[f"{op}:hedges"] += 1
+            tasks.append(asyncio.ensure_future(fn()))
+
+        last_error: Optional[BaseException] = None
+        winner: Optional["asyncio.Future[T]"] = None
+        pending = set(tasks)
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    if len(tasks) > 1 and t is tasks[1]:
+                        RESILIENCE_STATS[f"{op}:hedge_wins"] += 1
+                    winner = t
+                    return t.result()
+                last_error = t.exception()
+        raise last_error or asyncio.TimeoutError()
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+            elif t is not winner and discard is not None and not t.cancelled() and t.exception() is None:
+                await discard(t.result())
+
+
+async def call(
+    op: str,
+    fn: Callable[[], Awaitable[T]],
+    breaker: CircuitBreaker,
+    timeout: float,
+    retries: int = RETRIES,
+    hedge_after: Optional[float] = None,
+    discard: Optional[Callable[[T], Awaitable[None]]] = None,
+) -> T:
+    """
+    Roda fn() com prazo, tentativas e circuit breaker. fn precisa criar uma
+    chamada nova a cada invocação (é chamada de novo no retry/hedge).
+    discard libera o resultado de uma tentativa de hedge que perdeu a corrida.
+    """
+    last: Optional[BaseException] = None
+    for attempt in range(retries + 1):
+        breaker.allow()
+        try:
+            if hedge_after is not None and hedge_after < timeout:
+                result = await _race_hedged(op, fn, timeout, hedge_after, discard)
+            else:
+                result = await asyncio.wait_for(fn(), timeout)
+        except TRANSIENT_ERRORS as e:
+            last = e
+            breaker.record_failure()
+            if isinstance(e, asyncio.TimeoutError):
+                RESILIENCE_STATS[f"{op}:timeouts"] += 1
+            if attempt < retries and breaker.state == "closed":
+                RESILIENCE_STATS[f"{op}:retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            break
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+    RESILIENCE_STATS[f"{op}:unavailable"] += 1
+    raise UpstreamUnavailable(op, "sem resposta", last)
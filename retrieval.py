@@ -0,0 +1,396 @@
+"""
+ORLEM — memória da reunião (busca por similaridade nas falas anteriores).
+
+O ask_orlem só recebe a fala atual; mandar a transcrição inteira deixa o prompt
+crescendo com a reunião. Aqui cada fala gravada vira um embedding num índice
+local e, a cada pergunta, as falas anteriores mais parecidas (da reunião atual
+ou do workspace) entram no prompt dentro de um orçamento de tokens: resposta
+com base no que foi dito, com prompt de tamanho fixo.
+
+Índice: um arquivo por (modelo, dimensão) em ORLEM_VECTOR_DIR, com linhas de
+tamanho fixo (message_id, meeting_id, workspace_id, vetor float32 normalizado).
+Só recebe append e é lido com np.memmap (o SO cuida do cache; nada é carregado
+inteiro na memória). Cada lote sai num write só, com flock, então vários
+workers podem escrever no mesmo arquivo; message_id repetido é ignorado na busca.
+
+Indexação incremental: o app chama index_message() logo depois do add_message
+(com o workspace_id, quando já sabe). As falas ficam num buffer e vão num embed
+só a cada ORLEM_RAG_FLUSH_S; o workspace que faltar é buscado no banco nesse
+flush, pelo db_async (nada de query no event loop). No
+startup, sync() indexa o que foi gravado enquanto o índice estava parado
+(mensagens com id maior que o último indexado).
+
+Variáveis de ambiente:
+- ORLEM_RAG_ENABLED     (padrão 1)
+- ORLEM_VECTOR_DIR      (padrão vectors)
+- ORLEM_RAG_TOP_K       (padrão 6)        falas recuperadas no máximo
+- ORLEM_RAG_MAX_TOKENS  (padrão 600)      orçamento do trecho no prompt
+- ORLEM_RAG_MIN_SCORE   (padrão 0.25)     similaridade mínima (cosseno)
+- ORLEM_RAG_SCOPE       (padrão meeting)  meeting | workspace
+- ORLEM_RAG_TIMEOUT_S   (padrão 1.5)      prazo do embed da pergunta (estourou = sem contexto)
+- ORLEM_RAG_FLUSH_S     (padrão 0.5)      espera para juntar falas num embed só
+- ORLEM_EMBED_MODEL / ORLEM_EMBED_DIM: ver llm.py
+"""
+
+import asyncio
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock (um worker só)
+    fcntl = None
+
+import llm
+from db_async import get_meeting_workspace, get_messages_by_ids, list_messages_after
+from resilience import UpstreamUnavailable
+from transcript import ARTIFACT_TAGS, approx_tokens, format_turn
+
+RAG_ENABLED = os.getenv("ORLEM_RAG_ENABLED", "1") != "0"
+VECTOR_DIR = os.getenv("ORLEM_VECTOR_DIR", "vectors")
+RAG_TOP_K = int(os.getenv("ORLEM_RAG_TOP_K", "6"))
+RAG_MAX_TOKENS = int(os.getenv("ORLEM_RAG_MAX_TOKENS", "600"))
+RAG_MIN_SCORE = float(os.getenv("ORLEM_RAG_MIN_SCORE", "0.25"))
+RAG_SCOPE = os.getenv("ORLEM_RAG_SCOPE", "meeting").lower()
+RAG_TIMEOUT_S = float(os.getenv("ORLEM_RAG_TIMEOUT_S", "1.5"))
+RAG_FLUSH_S = float(os.getenv("ORLEM_RAG_FLUSH_S", "0.5"))
+
+# falas por chamada de embed e teto do buffer quando o embed está fora do ar
+EMBED_BATCH = 64
+MAX_PENDING = 2000
+# uma fala muito longa entra cortada no embed e no prompt
+MAX_CHARS = 2000
+
+INDEXED_ROLES = ("user", "orlem")
+
+# "indexed", "embed_calls", "embed_errors", "dropped", "synced", "queries", "hits", "empty", "unavailable"
+RETRIEVAL_STATS: Counter = Counter()
+
+_SLUG = re.compile(r"[^a-zA-Z0-9_.-]+")
+
+
+def _norm(text: Optional[str]) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def indexable(role: str, content: str) -> bool:
+    """Só fala de gente e resposta do Orlem; artefatos ([RESUMO]...) ficam de fora."""
+    text = (content or "").strip()
+    return role in INDEXED_ROLES and bool(text) and not text.startswith(ARTIFACT_TAGS)
+
+
+class VectorIndex:
+    """Arquivo de vetores só-append, lido via memmap."""
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(
+            [
+                ("message_id", "<i8"),
+                ("meeting_id", "<i8"),
+                ("workspace_id", "<i8"),
+                ("vec", "<f4", (dim,)),
+            ]
+        )
+        self._map: Optional[np.memmap] = None
+        self._rows = 0
+
+    def _refresh(self) -> int:
+        """Remapeia se o arquivo cresceu (outro worker pode ter escrito)."""
+        try:
+            rows = os.path.getsize(self.path) // self.dtype.itemsize
+        except FileNotFoundError:
+            rows = 0
+        if rows != self._rows:
+            self._map = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(rows,)) if rows else None
+            self._rows = rows
+        return rows
+
+    def __len__(self) -> int:
+        return self._refresh()
+
+    def append(
+        self,
+        message_ids: List[int],
+        meeting_ids: List[int],
+        workspace_ids: List[int],
+        vectors: List[List[float]],
+    ) -> None:
+        if not message_ids:
+            return
+        rows = np.zeros(len(message_ids), dtype=self.dtype)
+        rows["message_id"] = message_ids
+        rows["meeting_id"] = meeting_ids
+        rows["workspace_id"] = workspace_ids
+        vecs = np.asarray(vectors, dtype=np.float32).reshape(len(message_ids), self.dim)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        rows["vec"] = vecs / np.where(norms > 0, norms, 1.0)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            # linha pela metade (processo morreu no meio do write) desalinharia o resto
+            size = os.fstat(fd).st_size
+            if size % self.dtype.itemsize:
+                os.ftruncate(fd, size - size % self.dtype.itemsize)
+            data = memoryview(rows.tobytes())
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)  # fechar solta o flock
+
+    def last_message_id(self) -> int:
+        if not self._refresh():
+            return 0
+        return int(self._map["message_id"].max())
+
+    def search(
+        self,
+        query: List[float],
+        k: int,
+        meeting_id: Optional[int] = None,
+        workspace_id: Optional[int] = None,
+        min_score: float = 0.0,
+    ) -> List[Tuple[int, float]]:
+        """Top-k (message_id, cosseno) dentro da reunião/workspace, sem ids repetidos."""
+        n = self._refresh()
+        if not n or k <= 0:
+            return []
+        data = self._map
+        if meeting_id is not None:
+            idx = np.flatnonzero(data["meeting_id"] == meeting_id)
+        elif workspace_id is not None:
+            idx = np.flatnonzero(data["workspace_id"] == workspace_id)
+        else:
+            idx = np.arange(n)
+        if not idx.size:
+            return []
+
+        q = np.asarray(query, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+        scores = data["vec"][idx] @ q
+
+        # folga para os repetidos; o resto da ordenação é só no topo
+        take = min(idx.size, k * 2)
+        top = np.argpartition(-scores, take - 1)[:take]
+        top = top[np.argsort(-scores[top])]
+
+        out: List[Tuple[int, float]] = []
+        seen = set()
+        for i in top:
+            score = float(scores[i])
+            if score < min_score:
+                break
+            mid = int(data["message_id"][idx[i]])
+            if mid in seen:
+                continue
+            seen.add(mid)
+            out.append((mid, score))
+            if len(out) >= k:
+                break
+        return out
+
+
+class MeetingMemory:
+    """Índice das falas + buffer de indexação + montagem do contexto do prompt."""
+
+    def __init__(self, directory: str = VECTOR_DIR, model: Optional[str] = None, dim: Optional[int] = None):
+        self.model = model or llm.EMBED_MODEL
+        self.dim = dim or llm.EMBED_DIM
+        self.index = VectorIndex(
+            os.path.join(directory, f"messages-{_SLUG.sub('_', self.model)}-{self.dim}.f32"),
+            self.dim,
+        )
+        # (message_id, meeting_id, workspace_id ou None = resolver no flush, texto)
+        self._pending: List[Tuple[int, int, Optional[int], str]] = []
+        self._flush_task: Optional["asyncio.Task[None]"] = None
+        self._workspaces: Dict[int, int] = {}
+
+    # ---------- indexação ----------
+    async def _workspace(self, meeting_id: int) -> int:
+        ws = self._workspaces.get(meeting_id)
+        if ws is None:
+            ws = await get_meeting_workspace(meeting_id) or 0
+            self._workspaces[meeting_id] = ws
+        return ws
+
+    def index_message(
+        self,
+        message_id: int,
+        meeting_id: int,
+        role: str,
+        content: str,
+        workspace_id: Optional[int] = None,
+    ) -> None:
+        """
+        Enfileira uma fala recém-gravada (o embed sai em lote, em background).
+        Sem workspace_id, ele é resolvido no flush.
+        """
+        if not RAG_ENABLED or not indexable(role, content):
+            return
+        if len(self._pending) >= MAX_PENDING:
+            RETRIEVAL_STATS["dropped"] += 1
+            return
+        if workspace_id is None:
+            workspace_id = self._workspaces.get(meeting_id)
+        else:
+            self._workspaces[meeting_id] = workspace_id
+        self._pending.append((message_id, meeting_id, workspace_id, content[:MAX_CHARS]))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later(RAG_FLUSH_S))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await self._flush_pending()
+        except Exception as e:
+            # fica no buffer; tenta de novo mais tarde
+            RETRIEVAL_STATS["embed_errors"] += 1
+            print("Erro ao indexar falas:", repr(e))
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later(max(delay, 5.0)))
+
+    async def _flush_pending(self) -> None:
+        while self._pending:
+            batch = self._pending[:EMBED_BATCH]
+            resolved = [
+                (mid, meeting_id, ws if ws is not None else await self._workspace(meeting_id), text)
+                for mid, meeting_id, ws, text in batch
+            ]
+            await self._embed_and_append(resolved)
+            del self._pending[: len(batch)]
+
+    async def _embed_and_append(self, batch: List[Tuple[int, int, int, str]]) -> None:
+        RETRIEVAL_STATS["embed_calls"] += 1
+        vectors = await llm.embed([text for _, _, _, text in batch], model=self.model, dimensions=self.dim)
+        await asyncio.to_thread(
+            self.index.append,
+            [b[0] for b in batch],
+            [b[1] for b in batch],
+            [b[2] for b in batch],
+            vectors,
+        )
+        RETRIEVAL_STATS["indexed"] += len(batch)
+
+    async def flush(self) -> None:
+        """Grava o que está no buffer agora (shutdown)."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        try:
+            await self._flush_pending()
+        except Exception as e:
+            print("Falas não indexadas no shutdown (o sync do próximo startup pega):", repr(e))
+
+    async def sync(self) -> int:
+        """Indexa as mensagens gravadas depois da última indexada. Retorna quantas."""
+        if not RAG_ENABLED:
+            return 0
+        total = 0
+        after = await asyncio.to_thread(self.index.last_message_id)
+        try:
+            while True:
+                rows = await list_messages_after(after, EMBED_BATCH)
+                if not rows:
+                    break
+                after = rows[-1]["id"]
+                batch = [
+                    (r["id"], r["meeting_id"], r["workspace_id"] or 0, r["content"][:MAX_CHARS])
+                    for r in rows
+                    if indexable(r["role"], r["content"])
+                ]
+                if batch:
+                    await self._embed_and_append(batch)
+                    total += len(batch)
+        except Exception as e:
+            print("Sync do índice parou:", repr(e))
+        RETRIEVAL_STATS["synced"] += total
+        return total
+
+    # ---------- busca ----------
+    async def search(
+        self,
+        query: str,
+        meeting_id: Optional[int] = None,
+        workspace_id: Optional[int] = None,
+        k: int = RAG_TOP_K,
+    ) -> List[Tuple[int, float]]:
+        vectors = await llm.embed(
+            [query[:MAX_CHARS]], model=self.model, dimensions=self.dim, timeout=RAG_TIMEOUT_S, retries=0
+        )
+        return await asyncio.to_thread(
+            self.index.search, vectors[0], k, meeting_id, workspace_id, RAG_MIN_SCORE
+        )
+
+    async def context_for(
+        self,
+        query: str,
+        meeting_id: Optional[int],
+        scope: str = RAG_SCOPE,
+        max_tokens: int = RAG_MAX_TOKENS,
+        k: int = RAG_TOP_K,
+        exclude: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        """
+        Falas anteriores mais parecidas com a pergunta, em ordem cronológica e
+        dentro de max_tokens. Retorna {"text", "messages", "tokens"}; sem índice,
+        sem reunião ou com o embed fora do ar, volta vazio (a resposta segue sem contexto).
+        exclude: textos que não entram (ex.: a fala crua que gerou a pergunta).
+        """
+        empty: Dict[str, Any] = {"text": "", "messages": 0, "tokens": 0}
+        query = (query or "").strip()
+        if not RAG_ENABLED or not query or meeting_id is None:
+            return empty
+        RETRIEVAL_STATS["queries"] += 1
+
+        where: Dict[str, Any] = {"meeting_id": meeting_id}
+        if scope == "workspace":
+            where = {"workspace_id": await self._workspace(meeting_id)}
+        try:
+            # +1: a própria pergunta acabou de ser gravada e costuma ser o 1º resultado
+            hits = await self.search(query, k=k + 1, **where)
+        except UpstreamUnavailable as e:
+            RETRIEVAL_STATS["unavailable"] += 1
+            print("Busca na memória indisponível:", e)
+            return empty
+
+        msgs = await get_messages_by_ids([mid for mid, _ in hits])
+        skip = {_norm(t) for t in (query, *exclude)}
+        chosen: List[Dict[str, Any]] = []
+        used = 0
+        for m in msgs:
+            if _norm(m["content"]) in skip:
+                continue
+            line = format_turn({"role": m["role"], "content": m["content"][:MAX_CHARS]})
+            cost = approx_tokens(line) + 1
+            if used + cost > max_tokens:
+                continue
+            chosen.append({**m, "line": line})
+            used += cost
+            if len(chosen) >= k:
+                break
+
+        if not chosen:
+            RETRIEVAL_STATS["empty"] += 1
+            return empty
+        RETRIEVAL_STATS["hits"] += len(chosen)
+        chosen.sort(key=lambda m: m["id"])
+        return {"text": "\n".join(m["line"] for m in chosen), "messages": len(chosen), "tokens": used}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": RAG_ENABLED,
+            "scope": RAG_SCOPE,
+            "indexed_rows": len(self.index),
+            "pending": len(self._pending),
+            **dict(RETRIEVAL_STATS),
+        }
+
+
+# memória única do processo (usada pelo app e pelo brain)
+meeting_memory = MeetingMemory()
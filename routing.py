@@ -0,0 +1,173 @@
+"""
+ORLEM — escolha de modelo por intenção e tamanho do prompt.
+
+Cada chamada do brain diz o que é (intenção) e quantos tokens manda; a tabela
+de política decide o modelo:
+
+- conversation  resposta ao vivo na call / comandos curtos  -> modelo rápido
+- summary       resumo da reunião (parcial, final, map-reduce)
+- extraction    decisões e tarefas
+- diarization   organização por falante
+
+Dentro da intenção, "tiers" escolhem pelo tamanho: o primeiro tier com
+max_tokens >= tokens do prompt (None = sem limite). Assim um resumo curto
+fica no rápido e uma reunião de duas horas vai pro mais forte.
+
+Latência: cada (intenção, modelo) guarda as durações dos últimos
+ORLEM_ROUTING_WINDOW_S segundos. Se o p95 passar do slo_p95_s da intenção
+(com pelo menos ORLEM_ROUTING_MIN_SAMPLES medições), a intenção cai pro
+"fallback" (mais rápido) até o p95 voltar pro SLO ou as medições saírem da
+janela. Em stream mede-se o tempo até o 1º pedaço; no resto, a chamada toda.
+
+Variáveis de ambiente:
+- ORLEM_FAST_MODEL           (padrão MODEL_NAME)  modelo rápido
+- ORLEM_STRONG_MODEL         (padrão gpt-4o)      modelo para artefatos grandes
+- ORLEM_ROUTING_POLICY       (opcional)           JSON com a tabela (substitui
+                                                  por intenção a política padrão)
+- ORLEM_ROUTING_WINDOW_S     (padrão 300)
+- ORLEM_ROUTING_MIN_SAMPLES  (padrão 20)
+"""
+
+import json
+import os
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import llm
+
+FAST_MODEL = os.getenv("ORLEM_FAST_MODEL", llm.MODEL_NAME)
+STRONG_MODEL = os.getenv("ORLEM_STRONG_MODEL", "gpt-4o")
+ROUTING_POLICY_FILE = os.getenv("ORLEM_ROUTING_POLICY")
+ROUTING_WINDOW_S = float(os.getenv("ORLEM_ROUTING_WINDOW_S", "300"))
+ROUTING_MIN_SAMPLES = int(os.getenv("ORLEM_ROUTING_MIN_SAMPLES", "20"))
+
+INTENTS = ("conversation", "summary", "extraction", "diarization")
+
+DEFAULT_POLICY: Dict[str, Dict[str, Any]] = {
+    "conversation": {
+        "tiers": [{"max_tokens": None, "model": FAST_MODEL}],
+        "slo_p95_s": 2.5,
+        "fallback": FAST_MODEL,
+    },
+    "summary": {
+        "tiers": [
+            {"max_tokens": 1500, "model": FAST_MODEL},
+            {"max_tokens": None, "model": STRONG_MODEL},
+        ],
+        "slo_p95_s": 25.0,
+        "fallback": FAST_MODEL,
+    },
+    "extraction": {
+        "tiers": [
+            {"max_tokens": 3000, "model": FAST_MODEL},
+            {"max_tokens": None, "model": STRONG_MODEL},
+        ],
+        "slo_p95_s": 20.0,
+        "fallback": FAST_MODEL,
+    },
+    "diarization": {
+        "tiers": [{"max_tokens": None, "model": FAST_MODEL}],
+        "slo_p95_s": 20.0,
+        "fallback": FAST_MODEL,
+    },
+}
+
+
+def load_policy(path: Optional[str] = ROUTING_POLICY_FILE) -> Dict[str, Dict[str, Any]]:
+    """Política padrão, com as intenções do arquivo JSON (se houver) por cima."""
+    policy = {k: dict(v) for k, v in DEFAULT_POLICY.items()}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for intent, route in json.load(f).items():
+                policy[intent] = {**policy.get(intent, DEFAULT_POLICY["conversation"]), **route}
+    for intent, route in policy.items():
+        if not route.get("tiers"):
+            raise ValueError(f"política de roteamento sem tiers: {intent}")
+    return policy
+
+
+def _p95(values: List[float]) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(0.95 * len(values)))]
+
+
+class ModelRouter:
+    """Tabela de política + latências medidas por (intenção, modelo)."""
+
+    def __init__(
+        self,
+        policy: Optional[Dict[str, Dict[str, Any]]] = None,
+        window_s: float = ROUTING_WINDOW_S,
+        min_samples: int = ROUTING_MIN_SAMPLES,
+    ):
+        self.policy = policy or load_policy()
+        self.window_s = window_s
+        self.min_samples = min_samples
+        self._lat: Dict[Tuple[str, str], Deque[Tuple[float, float]]] = {}
+        # "route:<intenção>:<modelo>", "fallback:<intenção>"
+        self.counters: Counter = Counter()
+
+    def _route(self, intent: str) -> Dict[str, Any]:
+        return self.policy.get(intent) or self.policy["conversation"]
+
+    def pick(self, intent: str, prompt_tokens: int) -> str:
+        route = self._route(intent)
+        model = route["tiers"][-1]["model"]
+        for tier in route["tiers"]:
+            if tier.get("max_tokens") is None or prompt_tokens <= tier["max_tokens"]:
+                model = tier["model"]
+                break
+
+        fallback = route.get("fallback")
+        if fallback and fallback != model and self.degraded(intent, model):
+            self.counters[f"fallback:{intent}"] += 1
+            model = fallback
+        self.counters[f"route:{intent}:{model}"] += 1
+        return model
+
+    def observe(self, intent: str, model: str, seconds: float) -> None:
+        q = self._lat.setdefault((intent, model), deque(maxlen=1000))
+        q.append((time.monotonic(), seconds))
+
+    def _recent(self, intent: str, model: str) -> List[float]:
+        q = self._lat.get((intent, model))
+        if not q:
+            return []
+        cutoff = time.monotonic() - self.window_s
+        while q and q[0][0] < cutoff:
+            q.popleft()
+        return [s for _, s in q]
+
+    def p95(self, intent: str, model: str) -> Optional[float]:
+        values = self._recent(intent, model)
+        return _p95(values) if values else None
+
+    def hedge_delay(self, intent: str, model: str, default: float) -> float:
+        """p95 medido da rota (se já tiver medições suficientes), senão default."""
+        values = self._recent(intent, model)
+        if len(values) < self.min_samples:
+            return default
+        return _p95(values)
+
+    def degraded(self, intent: str, model: str) -> bool:
+        values = self._recent(intent, model)
+        if len(values) < self.min_samples:
+            return False
+        return _p95(values) > self._route(intent)["slo_p95_s"]
+
+    def stats(self) -> Dict[str, Any]:
+        routes = {}
+        for intent, model in list(self._lat):
+            values = self._recent(intent, model)
+            routes[f"{intent}:{model}"] = {
+                "samples": len(values),
+                "p95_s": round(_p95(values), 3) if values else None,
+                "slo_p95_s": self._route(intent)["slo_p95_s"],
+                "degraded": self.degraded(intent, model),
+            }
+        return {"routes": routes, **dict(self.counters)}
+
+
+# roteador único do processo (usado pelo brain)
+model_router = ModelRouter()
@@ -0,0 +1,224 @@
+"""
+ORLEM — estado de sessão compartilhado (session_id -> reunião, tom, atividade).
+
+Antes ficava em memória: active_sessions no app.py e um _MEETING_TONE global no
+brain.py. Com mais de um worker do uvicorn, o /stt caía num processo que não
+conhecia a reunião aberta pelo WebSocket, e o tom de uma call vazava pras outras.
+
+Agora tudo fica numa SessionStore:
+- SQLiteSessionStore (padrão): tabela session_states no mesmo banco, vale entre
+  processos
+- MemorySessionStore: dict local, para um processo só / testes
+
+O last_activity não é regravado a cada fala: touch() só vai ao banco quando
+due_for_touch() diz que a última gravação (neste processo) tem mais de
+ORLEM_SESSION_TOUCH_S. O app apaga as sessões paradas há mais de
+ORLEM_SESSION_IDLE_S com purge_idle(), a cada ORLEM_SESSION_PURGE_S.
+
+Variáveis de ambiente:
+- ORLEM_SESSION_STORE    (padrão sqlite)  sqlite | memory
+- ORLEM_SESSION_TOUCH_S  (padrão 60)      intervalo mínimo entre touch() da mesma sessão
+- ORLEM_SESSION_IDLE_S   (padrão 604800)  sessão parada há mais que isso é apagada
+- ORLEM_SESSION_PURGE_S  (padrão 3600)    intervalo entre as limpezas
+"""
+
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from db import SessionLocal
+from models import SessionState
+
+SESSION_STORE = os.getenv("ORLEM_SESSION_STORE", "sqlite").lower()
+SESSION_TOUCH_S = float(os.getenv("ORLEM_SESSION_TOUCH_S", "60"))
+SESSION_IDLE_S = int(os.getenv("ORLEM_SESSION_IDLE_S", str(7 * 86400)))
+SESSION_PURGE_S = float(os.getenv("ORLEM_SESSION_PURGE_S", "3600"))
+
+DEFAULT_SESSION = "session-local"
+DEFAULT_TONE = "auto"
+TONES = ("auto", "interno", "cliente", "neutro")
+
+
+class SessionStore(ABC):
+    """Interface: estado por session_id."""
+
+    def __init__(self, touch_interval_s: float = SESSION_TOUCH_S):
+        self.touch_interval_s = touch_interval_s
+        # session_id -> time.monotonic() da última gravação de atividade neste processo
+        self._touched: Dict[str, float] = {}
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def bind_meeting(self, session_id: str, meeting_id: int) -> None:
+        ...
+
+    @abstractmethod
+    def set_tone(self, session_id: str, tone: str) -> None:
+        ...
+
+    @abstractmethod
+    def touch(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def purge_idle(self, max_idle_seconds: int) -> int:
+        ...
+
+    # ---------- atividade ----------
+    def due_for_touch(self, session_id: str) -> bool:
+        """
+        Se vale a pena chamar touch() agora (sem ir ao banco). Falso quando este
+        processo gravou atividade da sessão há menos de touch_interval_s.
+        """
+        last = self._touched.get(session_id)
+        return last is None or time.monotonic() - last >= self.touch_interval_s
+
+    def _mark_touched(self, session_id: str) -> None:
+        self._touched[session_id] = time.monotonic()
+
+    def _forget_touched(self, max_idle_seconds: int) -> None:
+        cutoff = time.monotonic() - max_idle_seconds
+        for sid in [sid for sid, t in self._touched.items() if t < cutoff]:
+            self._touched.pop(sid, None)
+
+    # ---------- atalhos ----------
+    def get_meeting(self, session_id: str) -> Optional[int]:
+        st = self.get(session_id)
+        return st["meeting_id"] if st else None
+
+    def get_tone(self, session_id: str) -> str:
+        st = self.get(session_id)
+        return st["tone"] if st else DEFAULT_TONE
+
+    @staticmethod
+    def _check_tone(tone: str) -> str:
+        if tone not in TONES:
+            raise ValueError(f"tom inválido: {tone!r} (use {', '.join(TONES)})")
+        return tone
+
+
+class MemorySessionStore(SessionStore):
+    """Estado em memória do processo (não serve para vários workers)."""
+
+    def __init__(self, touch_interval_s: float = SESSION_TOUCH_S):
+        super().__init__(touch_interval_s)
+        self._states: Dict[str, Dict[str, Any]] = {}
+
+    def _state(self, session_id: str) -> Dict[str, Any]:
+        st = self._states.get(session_id)
+        if st is None:
+            now = datetime.utcnow()
+            st = {"session_id": session_id, "meeting_id": None, "tone": DEFAULT_TONE,
+                  "last_activity": now, "created_at": now}
+            self._states[session_id] = st
+        return st
+
+    def get(self, session_id):
+        st = self._states.get(session_id)
+        return dict(st) if st else None
+
+    def bind_meeting(self, session_id, meeting_id):
+        st = self._state(session_id)
+        st["meeting_id"] = meeting_id
+        st["last_activity"] = datetime.utcnow()
+        self._mark_touched(session_id)
+
+    def set_tone(self, session_id, tone):
+        st = self._state(session_id)
+        st["tone"] = self._check_tone(tone)
+        st["last_activity"] = datetime.utcnow()
+        self._mark_touched(session_id)
+
+    def touch(self, session_id):
+        self._state(session_id)["last_activity"] = datetime.utcnow()
+        self._mark_touched(session_id)
+
+    def purge_idle(self, max_idle_seconds):
+        cutoff = datetime.utcnow() - timedelta(seconds=max_idle_seconds)
+        old = [sid for sid, st in self._states.items() if st["last_activity"] < cutoff]
+        for sid in old:
+            del self._states[sid]
+        self._forget_touched(max_idle_seconds)
+        return len(old)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Estado na tabela session_states (compartilhado entre processos)."""
+
+    def get(self, session_id):
+        db = SessionLocal()
+        try:
+            st = db.get(SessionState, session_id)
+            if not st:
+                return None
+            return {
+                "session_id": st.session_id,
+                "meeting_id": st.meeting_id,
+                "tone": st.tone,
+                "last_activity": st.last_activity,
+                "created_at": st.created_at,
+            }
+        finally:
+            db.close()
+
+    def _update(self, session_id: str, **fields: Any) -> None:
+        # 2 tentativas: outro worker pode criar a mesma sessão entre o get e o commit
+        for attempt in range(2):
+            db = SessionLocal()
+            try:
+                st = db.get(SessionState, session_id)
+                if st is None:
+                    st = SessionState(session_id=session_id, tone=DEFAULT_TONE)
+                    db.add(st)
+                for k, v in fields.items():
+                    setattr(st, k, v)
+                st.last_activity = datetime.utcnow()
+                db.commit()
+                self._mark_touched(session_id)
+                return
+            except IntegrityError:
+                db.rollback()
+                if attempt:
+                    raise
+            finally:
+                db.close()
+
+    def bind_meeting(self, session_id, meeting_id):
+        self._update(session_id, meeting_id=meeting_id)
+
+    def set_tone(self, session_id, tone):
+        self._update(session_id, tone=self._check_tone(tone))
+
+    def touch(self, session_id):
+        self._update(session_id)
+
+    def purge_idle(self, max_idle_seconds):
+        cutoff = datetime.utcnow() - timedelta(seconds=max_idle_seconds)
+        db = SessionLocal()
+        try:
+            res = db.execute(delete(SessionState).where(SessionState.last_activity < cutoff))
+            db.commit()
+            self._forget_touched(max_idle_seconds)
+            return res.rowcount or 0
+        finally:
+            db.close()
+
+
+def make_session_store(kind: str = SESSION_STORE) -> SessionStore:
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    if kind == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"ORLEM_SESSION_STORE desconhecido: {kind!r} (use sqlite ou memory)")
+
+
+# store único do processo (usado pelo app e pelo brain)
+session_store = make_session_store()
@@ -0,0 +1,64 @@
+"""
+ORLEM — single-flight: pedidos iguais e simultâneos dividem uma só execução.
+
+Várias abas abrindo a mesma reunião disparavam o mesmo resumo/extração N vezes.
+Com o SingleFlight, o primeiro pedido de uma chave roda a função e os que
+chegam enquanto ela está em andamento só esperam o mesmo resultado (ou o mesmo
+erro). Terminou, a chave sai: o próximo pedido roda de novo (isso não é cache).
+
+A execução roda numa task própria: se o cliente que a disparou desconectar, os
+outros que estão esperando não perdem o resultado.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Agrupa chamadas concorrentes pela chave."""
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        # "calls", "executions", "coalesced", "errors" (+ "coalesced:<grupo>")
+        self.counters: Counter = Counter()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Roda fn() para a chave, ou espera a execução que já está em andamento.
+        Chaves em tupla usam o primeiro item como grupo nos contadores.
+        """
+        self.counters["calls"] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+            self.counters[f"coalesced:{self._group(key)}"] += 1
+        else:
+            self.counters["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+
+        # shield: cancelar quem espera não cancela a execução compartilhada
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.counters["errors"] += 1
+
+    @staticmethod
+    def _group(key: Hashable) -> str:
+        return str(key[0]) if isinstance(key, tuple) and key else str(key)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.counters["calls"]
+        return {
+            **dict(self.counters),
+            "inflight": len(self._inflight),
+            "coalesced_rate": round(self.counters["coalesced"] / calls, 4) if calls else 0.0,
+        }
@@ -0,0 +1,39 @@
+"""
+Testes do Orlem (pytest, na raiz do projeto: python -m pytest -q).
+
+O banco dos testes é um SQLite temporário (o orlem.db do projeto não é
+tocado); ORLEM_TEST_DATABASE_URL aponta pra outro (ex.: um PostgreSQL vazio).
+Precisa vir antes de qualquer import do db.py: o engine nasce no import.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["DATABASE_URL"] = os.getenv("ORLEM_TEST_DATABASE_URL") or (
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="orlem-test-"), "orlem.db")
+)
+os.environ.setdefault("ORLEM_BACKEND", "fake")
+
+
+@pytest.fixture(scope="session")
+def identity():
+    """(user_id, workspace_id) num banco com o esquema criado."""
+    import db
+
+    db.init_db()
+    return db.ensure_default_identity()
+
+
+@pytest.fixture
+def meeting_id(identity):
+    """Reunião nova e vazia."""
+    import db
+
+    user_id, workspace_id = identity
+    return db.create_meeting(user_id, title="teste", workspace_id=workspace_id)
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, UpstreamUnavailable, call
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0.0)
+
+
+def flaky(results):
+    """fn() que devolve/levanta os itens de `results` em ordem; conta as chamadas."""
+    calls = []
+
+    async def fn():
+        item = results[len(calls)]
+        calls.append(item)
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    return fn, calls
+
+
+def test_retries_transient_errors_then_succeeds():
+    fn, calls = flaky([asyncio.TimeoutError(), asyncio.TimeoutError(), "ok"])
+    breaker = CircuitBreaker("t", failures=10)
+
+    assert asyncio.run(call("t", fn, breaker, timeout=1, retries=2)) == "ok"
+    assert len(calls) == 3
+    assert breaker.state == "closed"
+
+
+def test_gives_up_after_retries_with_the_last_error():
+    error = asyncio.TimeoutError()
+    fn, calls = flaky([asyncio.TimeoutError(), error, "nunca"])
+
+    with pytest.raises(UpstreamUnavailable) as exc:
+        asyncio.run(call("t", fn, CircuitBreaker("t", failures=10), timeout=1, retries=1))
+    assert len(calls) == 2
+    assert exc.value.op == "t" and exc.value.cause is error
+
+
+def test_request_errors_are_not_retried_and_do_not_trip_the_breaker():
+    fn, calls = flaky([ValueError("pedido inválido"), "nunca"])
+    breaker = CircuitBreaker("t", failures=1)
+
+    with pytest.raises(ValueError):
+        asyncio.run(call("t", fn, breaker, timeout=1, retries=3))
+    assert len(calls) == 1
+    assert breaker.state == "closed"
+
+
+def test_deadline_counts_as_a_transient_failure():
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(UpstreamUnavailable) as exc:
+        asyncio.run(call("t", slow, CircuitBreaker("t", failures=10), timeout=0.01, retries=0))
+    assert isinstance(exc.value.cause, asyncio.TimeoutError)
+
+
+def test_open_breaker_stops_retries_and_fails_fast():
+    fn, calls = flaky([asyncio.TimeoutError()] * 5)
+    breaker = CircuitBreaker("t", failures=2, reset_timeout_s=60)
+
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(call("t", fn, breaker, timeout=1, retries=4))
+    assert len(calls) == 2  # abriu na 2ª falha: sem mais tentativas
+    assert breaker.state == "open"
+
+    with pytest.raises(UpstreamUnavailable, match="circuito aberto"):
+        asyncio.run(call("t", fn, breaker, timeout=1, retries=4))
+    assert len(calls) == 2
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = CircuitBreaker("t", failures=1, reset_timeout_s=0.01)
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    asyncio.run(asyncio.sleep(0.02))
+    assert breaker.state == "half_open"
+    breaker.allow()
+    with pytest.raises(UpstreamUnavailable, match="circuito em teste"):
+        breaker.allow()  # só uma chamada de teste por vez
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_the_breaker():
+    fn, calls = flaky([asyncio.TimeoutError(), "nunca"])
+    breaker = CircuitBreaker("t", failures=1, reset_timeout_s=0.01)
+    breaker.record_failure()
+    asyncio.run(asyncio.sleep(0.02))
+
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(call("t", fn, breaker, timeout=1, retries=3))
+    assert len(calls) == 1
+    assert breaker.state == "open" and breaker.opened_count == 2
+
+
+def test_hedge_returns_the_faster_attempt_and_discards_the_loser():
+    delays = [0.5, 0.0]
+    discarded = []
+
+    async def fn():
+        n = 2 - len(delays)
+        await asyncio.sleep(delays.pop(0))
+        return n
+
+    async def discard(result):
+        discarded.append(result)
+
+    result = asyncio.run(
+        call("t", fn, CircuitBreaker("t"), timeout=1, retries=0, hedge_after=0.02, discard=discard)
+    )
+    assert result == 1  # a 2ª tentativa (hedge) chegou antes
+    assert discarded == []  # a 1ª foi cancelada antes de terminar
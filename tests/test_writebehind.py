@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import db
+import db_async
+import writebehind
+from writebehind import MessageWriter, WRITER_STATS
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(writebehind, "WRITE_RETRY_BASE_S", 0.0)
+    WRITER_STATS.clear()
+
+
+def locked():
+    return OperationalError("INSERT", {}, Exception("database is locked"))
+
+
+def test_batches_keep_the_order_of_the_lines(meeting_id):
+    saved = []
+
+    async def scenario():
+        writer = MessageWriter(max_batch=10, max_delay_s=0.01)
+        futs = [
+            writer.add(meeting_id, "user", f"fala {i}", on_saved=saved.append)
+            for i in range(25)
+        ]
+        ids = await asyncio.gather(*futs)
+        await writer.close()
+        return ids
+
+    ids = asyncio.run(scenario())
+    assert ids == sorted(ids) and len(set(ids)) == 25
+    assert saved == ids  # on_saved depois do commit, na mesma ordem
+    assert [m["content"] for m in db.get_meeting_messages(meeting_id)] == [f"fala {i}" for i in range(25)]
+    assert WRITER_STATS["batches"] == 3 and WRITER_STATS["written"] == 25
+
+
+def test_flush_and_close_write_what_is_queued(meeting_id):
+    async def scenario():
+        writer = MessageWriter(max_batch=100, max_delay_s=60)
+        first = writer.add(meeting_id, "user", "a")
+        await writer.flush()  # não espera o prazo de 60s
+        assert first.done()
+        second = writer.add(meeting_id, "user", "b")
+        await writer.close()
+        return await first, await second
+
+    a, b = asyncio.run(scenario())
+    assert [m["id"] for m in db.get_meeting_messages(meeting_id)] == [a, b]
+
+
+def test_add_now_returns_the_id_after_the_commit(meeting_id):
+    async def scenario():
+        writer = MessageWriter(max_batch=100, max_delay_s=60)
+        queued = writer.add(meeting_id, "user", "na fila")
+        msg_id = await writer.add_now(meeting_id, "orlem", "na hora")
+        await writer.close()
+        return await queued, msg_id
+
+    queued, msg_id = asyncio.run(scenario())
+    assert msg_id > queued
+    assert db.get_meeting_messages(meeting_id)[-1]["id"] == msg_id
+
+
+def test_locked_database_is_retried(meeting_id, monkeypatch):
+    errors = [locked(), locked()]
+
+    async def add_messages(rows):
+        if errors:
+            raise errors.pop(0)
+        return await db_async.add_messages(rows)
+
+    monkeypatch.setattr(writebehind, "add_messages", add_messages)
+
+    async def scenario():
+        writer = MessageWriter(max_batch=10, max_delay_s=0.01)
+        msg_id = await writer.add(meeting_id, "user", "persistiu")
+        await writer.close()
+        return msg_id
+
+    msg_id = asyncio.run(scenario())
+    assert db.get_meeting_messages(meeting_id)[-1]["id"] == msg_id
+    assert WRITER_STATS["retries"] == 2 and WRITER_STATS["failed"] == 0
+
+
+def test_failed_batch_fails_its_futures_and_the_writer_keeps_going(meeting_id, monkeypatch):
+    calls = []
+    saved = []
+
+    async def add_messages(rows):
+        calls.append(len(rows))
+        if len(calls) <= writebehind.WRITE_RETRIES + 1:
+            raise locked()
+        return await db_async.add_messages(rows)
+
+    monkeypatch.setattr(writebehind, "add_messages", add_messages)
+
+    async def scenario():
+        writer = MessageWriter(max_batch=10, max_delay_s=0.01)
+        lost = [writer.add(meeting_id, "user", f"perdida {i}", on_saved=saved.append) for i in range(3)]
+        results = await asyncio.gather(*lost, return_exceptions=True)
+        later = await writer.add(meeting_id, "user", "depois")
+        await writer.close()
+        return results, later
+
+    results, later = asyncio.run(scenario())
+    assert all(isinstance(r, OperationalError) for r in results)
+    assert saved == []  # on_saved só com a fala gravada
+    assert WRITER_STATS["failed"] == 3 and WRITER_STATS["retries"] == writebehind.WRITE_RETRIES
+    assert [m["id"] for m in db.get_meeting_messages(meeting_id)] == [later]
+
+
+def test_other_errors_are_not_retried(meeting_id, monkeypatch):
+    calls = []
+
+    async def add_messages(rows):
+        calls.append(rows)
+        raise ValueError("linha inválida")
+
+    monkeypatch.setattr(writebehind, "add_messages", add_messages)
+
+    async def scenario():
+        writer = MessageWriter(max_batch=10, max_delay_s=0.01)
+        fut = writer.add(meeting_id, "user", "x")
+        with pytest.raises(ValueError):
+            await fut
+        await writer.close()
+
+    asyncio.run(scenario())
+    assert len(calls) == 1 and WRITER_STATS["retries"] == 0
+
+
+def test_sync_mode_writes_each_line_without_waiting(meeting_id):
+    async def scenario():
+        writer = MessageWriter(mode="sync", max_batch=100, max_delay_s=60)
+        msg_id = await asyncio.wait_for(writer.add(meeting_id, "user", "já"), 5)
+        await writer.close()
+        return msg_id
+
+    msg_id = asyncio.run(scenario())
+    assert db.get_meeting_messages(meeting_id)[-1]["id"] == msg_id
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        MessageWriter(mode="async")
@@ -0,0 +1,206 @@
+"""
+ORLEM — montagem de transcrição para o LLM.
+
+Um lugar só para transformar mensagens da reunião em texto de prompt:
+- filtra por papel (user/orlem/...) e por tag ([RESUMO], [DIARIZAÇÃO]...)
+  para os artefatos do próprio Orlem não virarem "resumo de resumo"
+- respeita um orçamento de tokens, mantendo as falas mais recentes e, do
+  resto, as mais relevantes (pergunta/termos de decisão e tarefa)
+- devolve as contagens de tokens do que entrou e do que ficou de fora
+"""
+
+import os
+import re
+from typing import List, Dict, Any, Optional, Iterable
+
+# artefatos gerados pelo próprio Orlem (não são fala da reunião)
+ARTIFACT_TAGS = ("[RESUMO]", "[DIARIZAÇÃO]", "[DIARIZACAO]")
+
+# tags/termos que tornam uma fala mais importante quando falta espaço
+IMPORTANT_TAGS = ("[DECISÃO]", "[TAREFA]", "[ACTION]", "[PRÓXIMO PASSO]")
+IMPORTANT_TERMS = ("decid", "decisão", "prazo", "responsável", "responsavel", "vamos", "fechado", "combinado")
+
+# orçamentos padrão (tokens de entrada) para chamadas de uma passada só
+TRANSCRIPT_MAX_TOKENS = int(os.getenv("ORLEM_TRANSCRIPT_MAX_TOKENS", "12000"))
+DIARIZE_MAX_TOKENS = int(os.getenv("ORLEM_DIARIZE_MAX_TOKENS", "6000"))
+
+_WORD = re.compile(r"\w{3,}")
+_SPEAKER_PREFIX = re.compile(r"^[^\s:][^:\n]{0,40}:")
+
+
+def approx_tokens(text: str) -> int:
+    # ~4 caracteres por token em português; suficiente pra orçamento de contexto
+    return (len(text or "") + 3) // 4
+
+
+def format_turn(m: Dict[str, Any]) -> str:
+    return f"{m['role']}: {m['content']}"
+
+
+def _keep_message(
+    m: Dict[str, Any],
+    roles: Optional[set],
+    exclude_tags: tuple,
+    include_tags: Optional[tuple],
+) -> bool:
+    if roles is not None and m.get("role") not in roles:
+        return False
+    content = (m.get("content") or "").lstrip()
+    if include_tags is not None and not content.startswith(include_tags):
+        return False
+    if exclude_tags and content.startswith(exclude_tags):
+        return False
+    return True
+
+
+def _relevance(line: str, query_words: set) -> float:
+    low = line.lower()
+    score = 0.0
+    if any(tag.lower() in low for tag in IMPORTANT_TAGS):
+        score += 3.0
+    score += sum(1.0 for t in IMPORTANT_TERMS if t in low)
+    if query_words:
+        score += 2.0 * len(query_words & set(_WORD.findall(low)))
+    return score
+
+
+def build_transcript(
+    messages: List[Dict[str, Any]],
+    roles: Optional[Iterable[str]] = None,
+    exclude_tags: Iterable[str] = ARTIFACT_TAGS,
+    include_tags: Optional[Iterable[str]] = None,
+    max_tokens: Optional[int] = None,
+    query: Optional[str] = None,
+    recent_share: float = 0.6,
+) -> Dict[str, Any]:
+    """
+    Monta a transcrição "quem: fala" a partir das mensagens (ordem cronológica).
+
+    - roles: só esses papéis (ex.: {"user"}); None = todos
+    - exclude_tags: descarta mensagens que começam com essas tags (padrão: artefatos)
+    - include_tags: se dado, só mensagens que começam com essas tags
+    - max_tokens: orçamento. Se estourar, entram primeiro as falas mais recentes
+      (até recent_share do orçamento) e o resto é preenchido pelas mais
+      relevantes (query + termos de decisão/tarefa), sempre em ordem cronológica.
+
+    Retorna {"text", "tokens", "messages", "candidates", "dropped",
+    "dropped_tokens", "total_tokens", "last_message_id"}.
+    """
+    role_set = set(roles) if roles is not None else None
+    excl = tuple(exclude_tags or ())
+    incl = tuple(include_tags) if include_tags is not None else None
+
+    picked = [m for m in messages if _keep_message(m, role_set, excl, incl)]
+    lines = [format_turn(m) for m in picked]
+    costs = [approx_tokens(ln) + 1 for ln in lines]  # +1 pela quebra de linha
+    total = sum(costs)
+
+    keep = list(range(len(lines)))
+    if max_tokens is not None and total > max_tokens:
+        chosen: set = set()
+        used = 0
+
+        # 1) mais recentes primeiro
+        recent_budget = int(max_tokens * recent_share)
+        for i in range(len(lines) - 1, -1, -1):
+            if used + costs[i] > recent_budget:
+                break
+            chosen.add(i)
+            used += costs[i]
+
+        # 2) do que sobrou, as mais relevantes
+        query_words = set(_WORD.findall((query or "").lower()))
+        rest = [i for i in range(len(lines)) if i not in chosen]
+        rest.sort(key=lambda i: (_relevance(lines[i], query_words), i), reverse=True)
+        for i in rest:
+            if used + costs[i] <= max_tokens:
+                chosen.add(i)
+                used += costs[i]
+
+        keep = sorted(chosen)
+
+        # nem a última fala cabe sozinha: entra cortada (o fim dela é o mais novo)
+        if not keep and lines:
+            max_chars = max_tokens * 4
+            lines[-1] = "..." + lines[-1][-(max_chars - 3):]
+            costs[-1] = approx_tokens(lines[-1]) + 1
+            keep = [len(lines) - 1]
+
+    text = "\n".join(lines[i] for i in keep)
+    tokens = sum(costs[i] for i in keep)
+    return {
+        "text": text,
+        "tokens": tokens,
+        "messages": len(keep),
+        "candidates": len(picked),
+        "dropped": len(picked) - len(keep),
+        "dropped_tokens": max(0, total - tokens),
+        "total_tokens": total,
+        "last_message_id": max((m["id"] for m in messages if "id" in m), default=None),
+    }
+
+
+def key_lines(transcript: str, limit: int = 8) -> List[str]:
+    """
+    As falas mais importantes (tags/termos de decisão e tarefa), em ordem
+    cronológica. Base dos resumos locais quando o modelo não responde.
+    """
+    turns = [t for t in split_turns(transcript) if t.strip()]
+    scored = sorted(range(len(turns)), key=lambda i: (_relevance(turns[i], set()), i), reverse=True)
+    keep = sorted(i for i in scored[:limit] if _relevance(turns[i], set()) > 0) or list(range(len(turns)))[-limit:]
+    return [turns[i] for i in sorted(keep)]
+
+
+def split_turns(transcript: str) -> List[str]:
+    """Separa um texto "quem: fala" em falas (uma fala pode ter várias linhas)."""
+    turns: List[str] = []
+    for line in (transcript or "").splitlines():
+        if turns and not _SPEAKER_PREFIX.match(line):
+            turns[-1] += "\n" + line
+        else:
+            turns.append(line)
+    return turns
+
+
+def fit_text(transcript: str, max_tokens: int) -> str:
+    """
+    Para quem só tem o texto pronto: se passar do orçamento, fica com as falas
+    mais recentes que cabem.
+    """
+    if approx_tokens(transcript) <= max_tokens:
+        return transcript
+    turns = split_turns(transcript)
+    kept: List[str] = []
+    used = 0
+    for turn in reversed(turns):
+        t = approx_tokens(turn) + 1
+        if used + t > max_tokens:
+            break
+        kept.append(turn)
+        used += t
+    if not kept and turns:
+        return "..." + turns[-1][-(max_tokens * 4 - 3):]
+    return "\n".join(reversed(kept))
+
+
+def chunk_transcript(transcript: str, max_tokens: int) -> List[str]:
+    """
+    Quebra a transcrição em trechos de até max_tokens, sem cortar fala no meio.
+    Só uma fala sozinha maior que o limite é cortada por tamanho.
+    """
+    max_chars = max_tokens * 4
+    chunks: List[str] = []
+    cur: List[str] = []
+    cur_tokens = 0
+    for turn in split_turns(transcript):
+        pieces = [turn[i:i + max_chars] for i in range(0, len(turn), max_chars)] or [turn]
+        for piece in pieces:
+            t = approx_tokens(piece) + 1
+            if cur and cur_tokens + t > max_tokens:
+                chunks.append("\n".join(cur))
+                cur, cur_tokens = [], 0
+            cur.append(piece)
+            cur_tokens += t
+    if cur:
+        chunks.append("\n".join(cur))
+    return chunks
@@ -0,0 +1,145 @@
+"""
+ORLEM — detector de palavra de ativação ("Orlem") com índice pré-computado.
+
+Mesma tolerância do detector antigo (_token_like_orlem):
+- token limpo (só letras, minúsculo) igual a uma variação conhecida, OU
+- SequenceMatcher(None, token, palavra).ratio() >= 0.6
+
+O que muda é o custo. Antes era um SequenceMatcher por token de cada fala. Agora
+quase todo token é descartado por filtros pré-computados, sem construir nada:
+
+1. tamanho: com ratio = 2*M/(n+L) e M <= min(n, L), só alguns tamanhos n passam;
+2. letras: M nunca passa do número de posições da palavra cujas letras aparecem
+   no token;
+3. deleções (estilo SymSpell): para cada tamanho n guardamos todas as
+   subsequências da palavra com k(n) letras, onde k(n) é o mínimo de acertos
+   para o ratio passar. Se nenhuma delas é subsequência do token, não passa.
+
+Os filtros nunca descartam um token que passaria. O que sobra (raro) é
+confirmado com o mesmo SequenceMatcher de antes, com memo. Tokens repetidos
+na mesma fala são vistos uma vez só.
+"""
+
+from difflib import SequenceMatcher
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+DEFAULT_THRESHOLD = 0.6
+
+
+@lru_cache(maxsize=4096)
+def _ratio_ok(token: str, word: str, threshold: float) -> bool:
+    return SequenceMatcher(None, token, word).ratio() >= threshold
+
+
+def _is_subsequence(small: str, big: str) -> bool:
+    it = iter(big)
+    return all(ch in it for ch in small)
+
+
+def _clean(token: str) -> str:
+    t = token.lower()
+    if t.isalpha():
+        return t
+    return "".join(ch for ch in t if ch.isalpha())
+
+
+class _FuzzyWord:
+    """Índice de uma palavra: tamanhos aceitos e deleções por tamanho."""
+
+    def __init__(self, word: str, threshold: float):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold precisa estar em (0, 1]")
+        self.word = word
+        self.threshold = threshold
+        L = len(word)
+
+        # n -> k(n): mínimo de caracteres em comum para o ratio passar
+        self.need: Dict[int, int] = {}
+        n = 1
+        while True:
+            best = min(n, L)
+            if n > L and 2.0 * best / (n + L) < threshold:
+                break  # daqui pra frente só piora
+            for k in range(0, best + 1):
+                if 2.0 * k / (n + L) >= threshold:
+                    self.need[n] = k
+                    break
+            n += 1
+
+        # k -> todas as subsequências da palavra com k letras
+        self.deletions: Dict[int, Set[str]] = {}
+        for k in set(self.need.values()):
+            self.deletions[k] = {"".join(c) for c in combinations(word, k)}
+
+        self.min_len = min(self.need) if self.need else 0
+
+    def matches(self, t: str) -> bool:
+        k = self.need.get(len(t))
+        if k is None:
+            return False
+
+        # quantas posições da palavra têm letra presente no token (limite de M)
+        present = set(t)
+        if sum(1 for ch in self.word if ch in present) < k:
+            return False
+
+        if not any(_is_subsequence(d, t) for d in self.deletions[k]):
+            return False
+
+        return _ratio_ok(t, self.word, self.threshold)
+
+
+class WakeWordIndex:
+    """Palavras de ativação + variações exatas, consultadas por token."""
+
+    def __init__(
+        self,
+        words: Iterable[str],
+        variants: Iterable[str] = (),
+        threshold: float = DEFAULT_THRESHOLD,
+    ):
+        self.words: List[str] = []
+        for w in words:
+            w = _clean(w)
+            if w and w not in self.words:
+                self.words.append(w)
+        self.variants: FrozenSet[str] = frozenset(_clean(v) for v in variants) | frozenset(self.words)
+        self.threshold = threshold
+        self._fuzzy = [_FuzzyWord(w, threshold) for w in self.words]
+
+        lens = [f.min_len for f in self._fuzzy if f.need] + [len(v) for v in self.variants]
+        self._min_len = min(lens) if lens else 0
+
+    def token_matches(self, token: str) -> bool:
+        """Um token (cru) parece alguma palavra de ativação?"""
+        if len(token) < self._min_len:
+            return False
+        t = _clean(token)
+        if not t:
+            return False
+        if t in self.variants:
+            return True
+        return any(f.matches(t) for f in self._fuzzy)
+
+    def mentions(self, text: str) -> bool:
+        """Alguma palavra de ativação aparece literalmente no texto?"""
+        low = (text or "").lower()
+        return any(w in low for w in self.words)
+
+    def is_called(self, text: str) -> bool:
+        """Mesmo contrato do is_calling_orlem antigo, generalizado para N palavras."""
+        s = (text or "").lower().strip()
+        if not s:
+            return False
+        if any(w in s for w in self.words):
+            return True
+        for tok in set(s.split()):
+            if self.token_matches(tok):
+                return True
+        return False
+
+    def describe(self) -> Dict[str, Tuple[int, ...]]:
+        """Tamanhos de token aceitos por palavra (útil pra depurar tolerância)."""
+        return {f.word: tuple(sorted(f.need)) for f in self._fuzzy}
@@ -118,15 +118,23 @@
   }
 
   function addChatMessage(role, text) {
-    if (!chatEl || !text) return;
+    if (!chatEl || !text) return null;
     const el = createMessageElement(role, text);
     chatEl.appendChild(el);
     autoScroll();
+    return el;
   }
 
   // ----------------- painel da direita -----------------
   function addPanelItem(container, emptyEl, countEl, text) {
     if (!text || !container) return;
+
+    // resumo e extração podem trazer a mesma linha: não repete no painel
+    const exists = Array.from(container.children).some(
+      (el) => el.textContent === text
+    );
+    if (exists) return;
+
     if (emptyEl) emptyEl.style.display = "none";
 
     const item = document.createElement("div");
@@ -231,14 +239,28 @@
       return;
     }
 
-    // 2) Resumo vindo em formato antigo [RESUMO]...
+    // 2) Decisões / ações extraídas no encerramento (uma por linha)
+    if (type === "decisions" || type === "actions") {
+      const [items, empty, count] =
+        type === "decisions"
+          ? [decisionsItems, decisionsEmpty, decisionsCount]
+          : [actionsItems, actionsEmpty, actionsCount];
+      text
+        .split("\n")
+        .map((l) => l.trim().replace(/^[-•*]+\s*/, ""))
+        .filter((l) => l && !l.endsWith(":"))
+        .forEach((l) => addPanelItem(items, empty, count, l));
+      return;
+    }
+
+    // 3) Resumo vindo em formato antigo [RESUMO]...
     if (type === "summary" || text.startsWith("[RESUMO]")) {
       const clean = text.replace(/^\[RESUMO\]\s*/i, "");
       addPanelItem(summaryItems, summaryEmpty, summaryCount, clean);
       return;
     }
 
-    // 3) Diarização
+    // 4) Diarização
     if (
       type === "diarize" ||
       text.startsWith("[DIARIZAÇÃO]") ||
@@ -251,7 +273,7 @@
       return;
     }
 
-    // 4) Heurísticas pra decisões / tarefas em respostas normais
+    // 5) Heurísticas pra decisões / tarefas em respostas normais
     const low = text.toLowerCase();
     if (
       low.includes("responsável") ||
@@ -277,23 +299,106 @@
   }
 
   // ----------------- TTS -----------------
-  async function speak(text) {
-    if (!text) return;
+  // os trechos são buscados em paralelo, mas tocados em ordem (um de cada vez)
+  let speechChain = Promise.resolve();
+
+  async function fetchSpeech(text) {
     try {
       const resp = await fetch("/speak", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ text }),
       });
-      if (!resp.ok) return;
+      if (!resp.ok) return null;
+
+      // servidor sem voz (fallback): fala com a voz do navegador
+      const ctype = resp.headers.get("content-type") || "";
+      if (ctype.includes("application/json")) {
+        return { browserText: text };
+      }
 
       const blob = await resp.blob();
-      const url = URL.createObjectURL(blob);
-      const audio = new Audio(url);
-      audio.play();
+      return URL.createObjectURL(blob);
     } catch (e) {
       console.error("Erro ao tocar voz do Orlem:", e);
+      return null;
+    }
+  }
+
+  function speakWithBrowser(text) {
+    return new Promise((resolve) => {
+      if (!window.speechSynthesis) return resolve();
+      const utter = new SpeechSynthesisUtterance(text);
+      utter.lang = "pt-BR";
+      utter.onend = resolve;
+      utter.onerror = resolve;
+      window.speechSynthesis.speak(utter);
+    });
+  }
+
+  function speak(text) {
+    if (!text || !text.trim()) return;
+    const urlPromise = fetchSpeech(text);
+    speechChain = speechChain.then(async () => {
+      const url = await urlPromise;
+      if (!url) return;
+      if (url.browserText) {
+        await speakWithBrowser(url.browserText);
+        return;
+      }
+      await new Promise((resolve) => {
+        const audio = new Audio(url);
+        audio.onended = resolve;
+        audio.onerror = resolve;
+        audio.play().catch(resolve);
+      });
+    });
+  }
+
+  // ----------------- resposta em streaming -----------------
+  // rascunho da resposta atual (frames "answer_delta"); o frame "answer" fecha
+  let draft = null; // { el, body, text, spoken }
+
+  function handleAnswerDelta(delta) {
+    if (!delta) return;
+    if (!draft) {
+      const el = addChatMessage("orlem", delta);
+      if (!el) return;
+      draft = { el, body: el.lastChild, text: "", spoken: 0 };
+    }
+    draft.text += delta;
+    draft.body.textContent = draft.text;
+    autoScroll();
+
+    // fala cada frase assim que ela termina
+    const pending = draft.text.slice(draft.spoken);
+    const m = pending.match(/^[\s\S]*[.!?…](\s|$)/);
+    if (m && m[0].trim()) {
+      speak(m[0]);
+      draft.spoken += m[0].length;
+    }
+  }
+
+  function finishAnswer(answer) {
+    if (!draft) {
+      addChatMessage("orlem", answer);
+      routeToPanels("answer", answer);
+      speak(answer); // fala a resposta
+      return;
     }
+
+    const spokenText = draft.text.slice(0, draft.spoken);
+    draft.body.textContent = answer;
+    routeToPanels("answer", answer);
+
+    if (answer.startsWith(spokenText)) {
+      speak(answer.slice(spokenText.length));
+    } else {
+      // a resposta final foi reescrita no servidor: fala a versão final
+      speak(answer);
+    }
+    draft = null;
+    autoScroll();
   }
 
   // ----------------- WebSocket -----------------
@@ -352,11 +457,15 @@
           if (answer) sys(answer); // oculto por padrão
           break;
 
+        case "answer_delta":
+          handleAnswerDelta(payload.delta);
+          break;
+
         case "answer":
           if (answer) {
-            addChatMessage("orlem", answer);
-            routeToPanels("answer", answer);
-            speak(answer); // fala a resposta
+            finishAnswer(answer);
+          } else {
+            draft = null;
           }
           break;
 
@@ -374,6 +483,14 @@
           }
           break;
 
+        case "decisions":
+        case "actions":
+          if (answer) {
+            addChatMessage("orlem", answer);
+            routeToPanels(type, answer);
+          }
+          break;
+
         default:
           // silencioso
           break;
@@ -429,6 +546,7 @@
         const payload = {
             text,
             session_id: sessionId,
+            stream: true,
         };
         sendPayload(payload);
     }
@@ -561,6 +679,14 @@
             });
             const data = await resp.json();
 
+            if (data && data.fallback === "typing") {
+              addChatMessage(
+                "system",
+                "A transcrição está fora do ar agora. Digita a mensagem que eu sigo por texto."
+              );
+              return;
+            }
+
             if (data && data.text) {
               const rawText = (data.text || "").trim();
               if (!rawText) {
@@ -578,6 +704,7 @@
               sendPayload({
                 text: finalText,
                 session_id: sessionId,
+                stream: true,
               });
             } else {
               addChatMessage(
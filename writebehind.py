@@ -0,0 +1,194 @@
+"""
+ORLEM — gravação das falas em lote (write-behind).
+
+Cada fala do WebSocket e do /stt virava uma transação (sessão nova, commit,
+refresh só pra pegar o id), no thread do event loop. Agora as falas entram numa
+fila e saem num INSERT em lote, numa thread:
+
+- o lote sai quando junta ORLEM_WRITE_BATCH falas ou ORLEM_WRITE_DELAY_S depois
+  da 1ª fala da fila (o que vier antes)
+- ordem preservada: um escritor só, lotes em sequência
+- add() devolve um Future com o id; on_saved(id) roda depois do commit
+- add_now() grava na hora e devolve o id (pra quem precisa dele já)
+- flush() grava o que está na fila; quem lê a reunião do banco chama antes
+  (resumo, encerramento, API), e o shutdown chama close()
+
+Durabilidade: a fala só está no banco quando o Future resolve. Se o processo
+morrer, perdem-se no máximo as falas dos últimos ORLEM_WRITE_DELAY_S (elas já
+estão no log JSONL da sessão em logs/, que é gravado antes). Erro de banco
+("database is locked" etc.) tenta de novo algumas vezes; esgotado, o Future
+falha e o erro vai pro log.
+
+Variáveis de ambiente:
+- ORLEM_WRITE_MODE     (padrão batch)  batch | sync (cada fala sai na hora, fora do loop)
+- ORLEM_WRITE_BATCH    (padrão 100)    falas por INSERT
+- ORLEM_WRITE_DELAY_S  (padrão 0.05)   espera máxima de uma fala na fila
+"""
+
+import asyncio
+import os
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+
+from db_async import add_messages
+
+WRITE_MODE = os.getenv("ORLEM_WRITE_MODE", "batch").lower()
+WRITE_BATCH = int(os.getenv("ORLEM_WRITE_BATCH", "100"))
+WRITE_DELAY_S = float(os.getenv("ORLEM_WRITE_DELAY_S", "0.05"))
+
+# novas tentativas de um lote em erro de banco (espera dobra a cada uma)
+WRITE_RETRIES = 3
+WRITE_RETRY_BASE_S = 0.1
+
+# "queued", "written", "batches", "retries", "failed"
+WRITER_STATS: Counter = Counter()
+
+Row = Dict[str, Any]
+
+
+def _consume_error(fut: "asyncio.Future[int]") -> None:
+    # quem não espera o Future não deve gerar "exception was never retrieved"
+    if not fut.cancelled():
+        fut.exception()
+
+
+class MessageWriter:
+    """Fila de falas -> INSERT em lote (um escritor por processo)."""
+
+    def __init__(
+        self,
+        mode: str = WRITE_MODE,
+        max_batch: int = WRITE_BATCH,
+        max_delay_s: float = WRITE_DELAY_S,
+    ):
+        if mode not in ("batch", "sync"):
+            raise ValueError(f"ORLEM_WRITE_MODE desconhecido: {mode!r} (use batch ou sync)")
+        self.mode = mode
+        self.max_batch = max(1, max_batch)
+        self.max_delay_s = max_delay_s
+        self._pending: List[Tuple[Row, "asyncio.Future[int]"]] = []
+        self._lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._closed = False
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._closed = False
+            self._lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def add(
+        self,
+        meeting_id: int,
+        role: str,
+        content: str,
+        meta_json: Optional[str] = None,
+        on_saved: Optional[Callable[[int], None]] = None,
+    ) -> "asyncio.Future[int]":
+        """Enfileira uma fala. O Future resolve com o id depois do commit."""
+        fut: "asyncio.Future[int]" = asyncio.get_running_loop().create_future()
+        fut.add_done_callback(_consume_error)
+        if on_saved is not None:
+            fut.add_done_callback(
+                lambda f: on_saved(f.result()) if not f.cancelled() and f.exception() is None else None
+            )
+        row = {"meeting_id": meeting_id, "role": role, "content": content, "meta_json": meta_json}
+        self._pending.append((row, fut))
+        WRITER_STATS["queued"] += 1
+
+        self._ensure_running()
+        # 1ª da fila liga o prazo; lote cheio (ou modo sync) grava na hora
+        if len(self._pending) == 1 or len(self._pending) >= self.max_batch or self.mode == "sync" or self._closed:
+            self._wakeup.set()
+        return fut
+
+    async def add_now(self, meeting_id: int, role: str, content: str, meta_json: Optional[str] = None) -> int:
+        """Grava já (junto com o que estiver na fila) e devolve o id."""
+        fut = self.add(meeting_id, role, content, meta_json)
+        await self.flush()
+        return await fut
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            # espera o lote encher ou o prazo vencer
+            if self.mode == "batch" and len(self._pending) < self.max_batch and not self._closed:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.max_delay_s)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Grava tudo que está na fila agora (em lotes, na ordem)."""
+        if self._lock is None:
+            return
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[: self.max_batch]
+                del self._pending[: len(batch)]
+                await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[Row, "asyncio.Future[int]"]]) -> None:
+        rows = [row for row, _ in batch]
+        error: Optional[BaseException] = None
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                ids = await add_messages(rows)
+                error = None
+            except OperationalError as e:
+                error = e
+                if attempt < WRITE_RETRIES:
+                    WRITER_STATS["retries"] += 1
+                    await asyncio.sleep(WRITE_RETRY_BASE_S * (2 ** attempt))
+                    continue
+            except Exception as e:
+                error = e
+            break
+
+        if error is not None:
+            WRITER_STATS["failed"] += len(batch)
+            print(f"Erro ao gravar {len(batch)} falas:", repr(error))
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(error)
+            return
+
+        WRITER_STATS["batches"] += 1
+        WRITER_STATS["written"] += len(batch)
+        for (_, fut), msg_id in zip(batch, ids):
+            if not fut.done():
+                fut.set_result(msg_id)
+
+    async def close(self) -> None:
+        """Shutdown: grava o que falta e para o escritor."""
+        self._closed = True
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "pending": len(self._pending),
+            "max_batch": self.max_batch,
+            "max_delay_s": self.max_delay_s,
+            **dict(WRITER_STATS),
+        }
+
+
+# escritor único do processo (usado pelo app)
+message_writer = MessageWriter()